@@ -0,0 +1,73 @@
+# synthetic maritime news corpus: incidents, near misses and plain trade news
+#
+# Deterministic for a given (n, seed), so two benchmark runs see the same
+# articles. Incident texts carry what the extractors look for (vessel names,
+# IMO numbers, ports, dates) and plenty of filler so article pages look like
+# real ones to trafilatura.
+
+import random
+from datetime import date, timedelta
+
+VESSELS = ["Ever Given", "Maersk Honam", "MSC Flaminia", "Stena Impero", "X-Press Pearl", "Wakashio",
+           "Golden Ray", "Sanchi", "Front Altair", "Hyundai Fortune", "Yantian Express", "Felicity Ace",
+           "Dali", "Sea Empress", "Baltic Ace", "Kea Trader", "Rena", "Prestige", "Marco Polo", "Ocean Glory"]
+PREFIXES = ["MV", "MT", "M/V", "MS", ""]
+PORTS = ["Singapore", "Rotterdam", "Shanghai", "Antwerp", "Hamburg", "Los Angeles", "Santos", "Durban",
+         "Jebel Ali", "Port Said", "Piraeus", "Colombo", "Busan", "Felixstowe", "Algeciras", "Houston"]
+INCIDENTS = {
+    "grounding": ["ran aground", "grounded on a sandbank", "was refloated after grounding"],
+    "collision": ["collided with a bulk carrier", "was involved in a collision", "struck a moored tanker"],
+    "fire": ["caught fire in the engine room", "reported a fire in a cargo hold", "was ablaze"],
+    "piracy": ["was boarded by pirates", "was hijacked by armed men", "repelled a piracy attempt"],
+    "weather": ["lost containers in a storm", "was damaged by a typhoon", "sought shelter from a gale"],
+    "port_closure": ["was held as the port closure continued", "waited out a port closure"],
+    "strike": ["was delayed by a dockworkers strike", "could not berth during the strike"],
+    "spill": ["leaked fuel oil after the incident", "caused an oil spill near the coast"],
+}
+NEWS = ["container rates edged higher this week", "the carrier reported quarterly earnings above forecast",
+        "a new fleet renewal deal was signed", "tariff talks weighed on the market outlook",
+        "the shipyard announced an acquisition", "analysts expect freight demand to soften"]
+FILLER = ["Port authorities said operations at the terminal continue under close monitoring.",
+          "The vessel's manager said the crew are safe and accounted for.",
+          "Traffic in the channel was briefly suspended while tugs assisted at the berth.",
+          "Classification society surveyors are expected to inspect the hull and draft marks.",
+          "Shipping lines operating in the area have been advised to follow local notices.",
+          "Container volumes through the port rose four percent on the previous quarter.",
+          "Anchorage congestion has eased since the start of the month.",
+          "Insurers said it was too early to estimate the cost of the damage."]
+
+
+def _imo(rnd):
+    # valid IMO check digit: weights 7..2 over the first six digits
+    d = [rnd.randint(1, 9)] + [rnd.randint(0, 9) for _ in range(5)]
+    return "".join(map(str, d)) + str(sum(x * w for x, w in zip(d, range(7, 1, -1))) % 10)
+
+
+def make_article(i: int, rnd: random.Random, incident_rate: float = 0.3) -> dict:
+    day = date(2025, 1, 1) + timedelta(days=rnd.randrange(300))
+    port = rnd.choice(PORTS)
+    paras = rnd.sample(FILLER, k=rnd.randint(3, 6))
+    if rnd.random() < incident_rate:
+        kind = rnd.choice(sorted(INCIDENTS))
+        vessel = f"{rnd.choice(PREFIXES)} {rnd.choice(VESSELS)}".strip()
+        imo = _imo(rnd) if rnd.random() < 0.5 else None
+        title = f"{vessel} {rnd.choice(INCIDENTS[kind])} off {port}"
+        lead = (f"The vessel {vessel}{f' (IMO {imo})' if imo else ''} {rnd.choice(INCIDENTS[kind])} "
+                f"near the port of {port} on {day:%d %B %Y}, officials said.")
+        truth = {"is_incident": True, "type": kind, "vessel": vessel, "imo": imo, "port": port,
+                 "date": day.isoformat()}
+    else:
+        title = f"{port} port: {rnd.choice(NEWS).capitalize()}"
+        lead = f"At the port of {port}, {rnd.choice(NEWS)}, according to people familiar with the matter."
+        truth = {"is_incident": False}
+    return {"id": f"a{i:06d}", "title": title, "published": day, "paragraphs": [lead, *paras],
+            "truth": truth}
+
+
+def make_corpus(n: int, seed: int = 42, incident_rate: float = 0.3) -> list[dict]:
+    rnd = random.Random(seed)
+    return [make_article(i, rnd, incident_rate) for i in range(n)]
+
+
+def article_text(a: dict) -> str:
+    return "\n\n".join(a["paragraphs"])
@@ -0,0 +1,310 @@
+# pipeline benchmark: synthetic corpus + local HTTP stand-in, per stage and end-to-end
+#
+#   python -m bench.run --docs 1000                      # all stages, results → bench/results/
+#   python -m bench.run --stages ingest,extract --docs 300
+#   python -m bench.run --save-baseline                  # store as bench/baseline.json
+#   python -m bench.run --baseline bench/baseline.json   # flag regressions (exit 1)
+#
+# The baseline is not committed: timings only compare on the machine that
+# produced them, so save one locally before changing anything.
+#
+# Every stage runs in a fresh process, so peak RSS is per stage. Reported per
+# stage: docs, seconds, docs/sec, p50/p99 per-doc latency (ms), peak RSS (MB).
+# Setup (imports, model loading, corpus generation) is not timed. Latency is
+# submit → result, so under concurrency it includes queueing. Stages write to
+# a scratch dir only (doc store of either DOC_STORE backend included); a run
+# that touches the repo's data/ anyway fails.
+#
+#   ingest          fetch + normalize from the local RSS/HTML server (Ingestor)
+#   classify_mock   MockClassifier.classify per doc
+#   classify_azure  AzureOpenAIClassifier.aclassify against the local OpenAI endpoint
+#   extract         extract_entities per doc
+#   e2e             pipeline.run.Pipeline: local server → extracted, latency per doc
+
+import argparse, asyncio, json, multiprocessing as mp, os, platform, resource, statistics
+import subprocess, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+from bench.corpus import make_corpus, article_text
+from bench.server import BenchServer
+
+STAGES = ("ingest", "classify_mock", "classify_azure", "extract", "e2e")
+RESULTS_DIR = ROOT / "bench" / "results"
+DATA = ROOT / "data"
+BASELINE = ROOT / "bench" / "baseline.json"
+
+# metric → True if bigger is better
+METRICS = {"docs_per_sec": True, "p50_ms": False, "p99_ms": False, "peak_rss_mb": False}
+
+
+def _peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KB on Linux
+
+
+def _pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))] if xs else None
+
+
+def _doc_texts(cfg):
+    corpus = make_corpus(cfg["docs"], cfg["seed"])
+    return [(a["title"], article_text(a)) for a in corpus]
+
+
+def _timed_each(fn, items):
+    lat = []
+    t0 = time.perf_counter()
+    for it in items:
+        t1 = time.perf_counter()
+        fn(it)
+        lat.append(time.perf_counter() - t1)
+    return time.perf_counter() - t0, lat
+
+
+# ---- stages (each runs in its own process) ----
+
+def _data_snapshot() -> dict:
+    return {str(p.relative_to(DATA)): (st.st_size, st.st_mtime_ns)
+            for p in DATA.rglob("*") if p.is_file() and (st := p.stat())} if DATA.exists() else {}
+
+
+def _point_ingest_at(data: Path, cfg) -> dict:
+    """Send run_ingest's files into a scratch dir and its sources at the bench
+    server; returns the Ingestor/ingest_once kwargs that keep its doc store and
+    prefilter stats there too."""
+    sys.path.append(str(ROOT / "ingest"))
+    import run_ingest
+    run_ingest.DATA, run_ingest.RAW, run_ingest.NORM = data, data / "raw", data / "normalized"
+    run_ingest.CATALOG = data / "catalog.jsonl"
+    run_ingest.SEEN_INDEX = data / "seen_urls.json"
+    run_ingest.FEED_CACHE = data / "feed_cache.json"
+    run_ingest.NEAR_DUP_INDEX = data / "near_dup.json"
+    run_ingest.NORM.mkdir(parents=True, exist_ok=True)
+    run_ingest.read_sources = lambda: iter(cfg["sources"])
+    run_ingest.PER_HOST = cfg["per_host"]
+    if not cfg["polite"]:
+        run_ingest.POLITE_DELAY = 0  # measure our code, not the courtesy pause
+    from common.docstore import open_store
+    return {"workers": cfg["ingest_workers"], "cpu_workers": cfg["ingest_cpu_workers"],
+            "store": open_store(root=data, path=data / "docs.sqlite"),
+            "prefilter": run_ingest.Prefilter(path=data / "prefilter.json")}
+
+
+def stage_ingest(cfg):
+    with tempfile.TemporaryDirectory() as tmp:
+        kw = _point_ingest_at(Path(tmp) / "data", cfg)
+        import run_ingest
+        lat, norm_item = [], run_ingest.norm_item
+
+        def timed(*a, **kw):
+            t0 = time.perf_counter()
+            try:
+                return norm_item(*a, **kw)
+            finally:
+                lat.append(time.perf_counter() - t0)
+
+        run_ingest.norm_item = timed
+        # with --ingest-cpu-workers norm_item isn't called, so there are no per-doc latencies
+        ing = run_ingest.Ingestor(**kw)
+        t0 = time.perf_counter()
+        ing.ingest_sources(cfg["sources"])
+        seconds = time.perf_counter() - t0
+        ing.close()
+        kw["store"].close()
+        return {"docs": ing.new_count, "seconds": seconds, "latencies": lat}
+
+
+def stage_classify_mock(cfg):
+    from classify.providers.mock_provider import MockClassifier
+    clf = MockClassifier()
+    texts = [f"{t}\n{x[:1000]}" for t, x in _doc_texts(cfg)]
+    seconds, lat = _timed_each(clf.classify, texts)
+    return {"docs": len(texts), "seconds": seconds, "latencies": lat}
+
+
+def _use_bench_llm(cfg):
+    os.environ.update({"AZURE_OPENAI_ENDPOINT": cfg["url"], "AZURE_OPENAI_API_KEY": "bench",
+                       "AZURE_OPENAI_DEPLOYMENT": "bench", "LLM_CACHE": "0"})
+
+
+def stage_classify_azure(cfg):
+    _use_bench_llm(cfg)
+    from classify.providers.azure_provider import AzureOpenAIClassifier
+    from classify.providers.base import ERROR_RESULT
+    clf = AzureOpenAIClassifier()
+    texts = [f"{t}\n{x[:1000]}" for t, x in _doc_texts(cfg)]
+    lat, errors = [], 0
+
+    async def go():
+        async def one(text):
+            nonlocal errors
+            t0 = time.perf_counter()
+            errors += await clf.aclassify(text) == ERROR_RESULT
+            lat.append(time.perf_counter() - t0)
+        await asyncio.gather(*(one(t) for t in texts))
+
+    t0 = time.perf_counter()
+    asyncio.run(go())
+    return {"docs": len(texts), "seconds": time.perf_counter() - t0, "latencies": lat, "errors": errors}
+
+
+def stage_extract(cfg):
+    from extract.run import extract_entities, get_nlp
+    get_nlp()  # model load is setup, not throughput
+    docs = _doc_texts(cfg)
+    seconds, lat = _timed_each(lambda d: extract_entities(*d), docs)
+    return {"docs": len(docs), "seconds": seconds, "latencies": lat}
+
+
+def stage_e2e(cfg):
+    if cfg["llm"] == "azure":
+        _use_bench_llm(cfg)
+    os.environ["LLM_PROVIDER"] = cfg["llm"]
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp) / "data"
+        kw = _point_ingest_at(data, cfg)
+        from pipeline.run import Pipeline
+        p = Pipeline(store=kw.pop("store"), manifests=data / "manifests")
+        t0 = time.perf_counter()
+        p.run(**kw)  # closes the store
+        seconds = time.perf_counter() - t0
+        lat = p.latency["incident"] + p.latency["other"]
+        return {"docs": p.ingested, "seconds": seconds, "latencies": lat,
+                "incidents": len(p.latency["incident"]),
+                "incident_p50_ms": round(1000 * statistics.median(p.latency["incident"]), 2)
+                if p.latency["incident"] else None}
+
+
+def _child(name, cfg, out):
+    try:
+        res = globals()[f"stage_{name}"](cfg)
+        lat = res.pop("latencies")
+        res.update(seconds=round(res["seconds"], 3),
+                   docs_per_sec=round(res["docs"] / res["seconds"], 2) if res["seconds"] else None,
+                   p50_ms=round(1000 * _pct(lat, 0.50), 2) if lat else None,
+                   p99_ms=round(1000 * _pct(lat, 0.99), 2) if lat else None)
+    except Exception as e:  # missing optional deps etc. → recorded, not fatal
+        res = {"skipped": f"{type(e).__name__}: {e}"}
+    res["peak_rss_mb"] = _peak_rss_mb()
+    out.put(res)
+
+
+def run_stage(name, cfg) -> dict:
+    ctx = mp.get_context("spawn")  # fresh interpreter → honest per-stage RSS
+    q = ctx.Queue()
+    p = ctx.Process(target=_child, args=(name, cfg, q))
+    p.start()
+    res = q.get()
+    p.join()
+    return res
+
+
+# ---- results ----
+
+def compare(cur: dict, base: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of cur against base beyond tolerance."""
+    if cur["meta"]["docs"] != base["meta"]["docs"]:
+        print(f"note: baseline used {base['meta']['docs']} docs, this run {cur['meta']['docs']}")
+    out = []
+    for stage, m in cur["stages"].items():
+        b = base["stages"].get(stage)
+        if not b or "skipped" in m or "skipped" in b:
+            continue
+        for k, higher_better in METRICS.items():
+            if not m.get(k) or not b.get(k):
+                continue
+            change = (m[k] - b[k]) / b[k]
+            if (change < -tolerance) if higher_better else (change > tolerance):
+                out.append(f"{stage}.{k}: {b[k]} → {m[k]} ({change:+.0%})")
+    return out
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def print_table(results):
+    print(f"{'stage':<15} {'docs':>6} {'docs/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8}")
+    for name, r in results["stages"].items():
+        if "skipped" in r:
+            print(f"{name:<15} skipped ({r['skipped']})")
+            continue
+        fmt = lambda v, w: f"{v:>{w}}" if v is not None else f"{'-':>{w}}"
+        print(f"{name:<15} {fmt(r['docs'], 6)} {fmt(r['docs_per_sec'], 9)} {fmt(r['p50_ms'], 9)} "
+              f"{fmt(r['p99_ms'], 9)} {fmt(r['peak_rss_mb'], 8)}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="benchmark the pipeline against a local stand-in")
+    ap.add_argument("--docs", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--stages", default=",".join(STAGES))
+    ap.add_argument("--llm", choices=("mock", "azure"), default="mock", help="classifier used by e2e")
+    ap.add_argument("--llm-latency", type=float, default=0.05, help="seconds the fake model takes")
+    ap.add_argument("--ingest-workers", type=int, default=8)
+    ap.add_argument("--ingest-cpu-workers", type=int, default=0, help="ingest parser processes")
+    ap.add_argument("--per-host", type=int, default=8, help="all bench pages share one host")
+    ap.add_argument("--polite", action="store_true", help="keep ingest's per-fetch courtesy delay")
+    ap.add_argument("--out", help="results file (default bench/results/<time>.json)")
+    ap.add_argument("--baseline", help="compare against this results file; exit 1 on regressions")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    ap.add_argument("--save-baseline", action="store_true", help=f"also write {BASELINE.name}")
+    a = ap.parse_args()
+
+    stages = [s.strip() for s in a.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    server = BenchServer(make_corpus(a.docs, a.seed), a.llm_latency).start()
+    cfg = {"docs": a.docs, "seed": a.seed, "url": server.url, "sources": server.sources(),
+           "llm": a.llm, "ingest_workers": a.ingest_workers,
+           "ingest_cpu_workers": a.ingest_cpu_workers, "per_host": a.per_host, "polite": a.polite}
+    results = {"meta": {"docs": a.docs, "seed": a.seed, "llm": a.llm, "llm_latency": a.llm_latency,
+                        "ingest_cpu_workers": a.ingest_cpu_workers,
+                        "git": _git_rev(), "python": platform.python_version(),
+                        "machine": platform.machine(), "cpus": os.cpu_count(),
+                        "started": time.strftime("%Y-%m-%dT%H:%M:%S")},
+               "stages": {}}
+    before = _data_snapshot()
+    try:
+        for name in stages:
+            print(f"… {name}", flush=True)
+            results["stages"][name] = run_stage(name, cfg)
+    finally:
+        server.stop()
+    results["meta"]["server_requests"] = dict(server.requests)
+    after = _data_snapshot()
+    touched = sorted(k for k in before.keys() | after.keys() if before.get(k) != after.get(k))
+
+    out = Path(a.out) if a.out else RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print_table(results)
+    print(f"results → {out}")
+    if touched:
+        print(f"ERROR: the bench changed {DATA}: {', '.join(touched[:10])}"
+              f"{' …' if len(touched) > 10 else ''}")
+        sys.exit(1)
+    if a.save_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2))
+        print(f"baseline → {BASELINE}")
+
+    if a.baseline:
+        regressions = compare(results, json.loads(Path(a.baseline).read_text()), a.tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {a.tolerance:.0%} vs {a.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# local stand-in for the outside world: RSS feeds, article pages, an HTML
+# listing and an OpenAI-compatible chat completions endpoint
+#
+#   GET  /feed/<source>.xml                        RSS 2.0 (honours If-None-Match)
+#   GET  /list/<source>.html                       listing page for kind=html sources
+#   GET  /article/<id>.html                        article page
+#   POST /openai/deployments/<dep>/chat/completions   (Azure OpenAI path layout)
+#
+# Answers come from keyword rules, so a run measures our side of the wire;
+# --llm-latency adds a fixed model delay per request.
+
+import hashlib, json, re, threading, time
+from email.utils import format_datetime
+from datetime import datetime, timezone
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from bench.corpus import INCIDENTS
+
+PER_FEED = 200  # read_entries() looks at the first 200 entries of a feed
+
+_RULES = {k: re.compile("|".join(map(re.escape, v)), re.I) for k, v in INCIDENTS.items()}
+
+
+def fake_classify(text: str) -> dict:
+    types = [k for k, rx in _RULES.items() if rx.search(text or "")]
+    return {"is_incident": bool(types), "incident_types": types, "near_miss": False,
+            "confidence": 0.9 if types else 0.2, "rationale": "bench rule"}
+
+
+class BenchServer:
+    """Serves a corpus split over n_rss RSS sources plus one HTML source."""
+
+    def __init__(self, corpus, llm_latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.articles = {a["id"]: a for a in corpus}
+        self.llm_latency = llm_latency
+        self.requests = {"feed": 0, "list": 0, "article": 0, "llm": 0}
+        self._count_lock = threading.Lock()
+        html_share = corpus[: max(1, len(corpus) // 10)]          # ~10% behind an HTML listing
+        rss = corpus[len(html_share):]
+        self.feeds = {f"bench_rss_{i}": rss[j:j + PER_FEED]
+                      for i, j in enumerate(range(0, len(rss), PER_FEED))}
+        self.listings = {"bench_html": html_share}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def sources(self) -> list[dict]:
+        rows = [{"source_id": sid, "kind": "rss", "url": f"{self.url}/feed/{sid}.xml",
+                 "reliability": "0.9", "lang": "en"} for sid in self.feeds]
+        rows += [{"source_id": sid, "kind": "html", "url": f"{self.url}/list/{sid}.html",
+                  "reliability": "0.8", "lang": "en", "item_selector": "article",
+                  "link_selector": "a", "max_pages": "1"} for sid in self.listings]
+        return rows
+
+    # ---- pages ----
+
+    def _rss(self, sid):
+        items = []
+        for a in self.feeds[sid]:
+            pub = format_datetime(datetime.combine(a["published"], datetime.min.time(), timezone.utc))
+            items.append(f"<item><title>{escape(a['title'])}</title>"
+                         f"<link>{self.url}/article/{a['id']}.html</link><guid>{a['id']}</guid>"
+                         f"<pubDate>{pub}</pubDate>"
+                         f"<description>{escape(a['paragraphs'][0])}</description></item>")
+        return ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>{sid}</title><link>{self.url}</link>{''.join(items)}</channel></rss>")
+
+    def _listing(self, sid):
+        cards = "".join(f'<article><a href="{self.url}/article/{a["id"]}.html">{escape(a["title"])}</a></article>'
+                        for a in self.listings[sid])
+        return f"<html><body><main>{cards}</main></body></html>"
+
+    def _article(self, a):
+        paras = "".join(f"<p>{escape(p)}</p>" for p in a["paragraphs"])
+        return (f"<html><head><title>{escape(a['title'])}</title></head><body>"
+                "<nav><a href='/'>Home</a> | <a href='/news'>News</a></nav>"
+                f"<article><h1>{escape(a['title'])}</h1><time>{a['published']}</time>{paras}</article>"
+                "<footer>© Bench Maritime News</footer></body></html>")
+
+    def _completion(self, body):
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = next((m["content"] for m in messages if m.get("role") == "user"), "")
+        if "JSON array of items" in system:  # packed prompt
+            items = json.loads(user)
+            content = {"results": [{"id": it["id"], **fake_classify(it["text"])} for it in items]}
+        else:
+            content = fake_classify(user)
+        text = json.dumps(content)
+        prompt_tokens = len(system + user) // 4
+        return {"id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "bench"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(text) // 4,
+                          "total_tokens": prompt_tokens + len(text) // 4}}
+
+    def count(self, kind):
+        with self._count_lock:
+            self.requests[kind] += 1
+
+    # ---- http ----
+
+    def _handler(self):
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body: str = "", ctype="text/html; charset=utf-8", etag=None):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _page(self, kind, body, ctype="text/html; charset=utf-8"):
+                srv.count(kind)
+                etag = '"' + hashlib.md5(body.encode("utf-8")).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, etag=etag)
+                self._send(200, body, ctype, etag)
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if m := re.fullmatch(r"/feed/(\w+)\.xml", path):
+                    if m[1] in srv.feeds:
+                        return self._page("feed", srv._rss(m[1]), "application/rss+xml; charset=utf-8")
+                elif m := re.fullmatch(r"/list/(\w+)\.html", path):
+                    if m[1] in srv.listings:
+                        return self._page("list", srv._listing(m[1]))
+                elif m := re.fullmatch(r"/article/(\w+)\.html", path):
+                    if m[1] in srv.articles:
+                        return self._page("article", srv._article(srv.articles[m[1]]))
+                self._send(404, "not found", "text/plain")
+
+            def do_POST(self):
+                if not self.path.split("?")[0].endswith("/chat/completions"):
+                    return self._send(404, "not found", "text/plain")
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                srv.count("llm")
+                if srv.llm_latency:
+                    time.sleep(srv.llm_latency)
+                self._send(200, json.dumps(srv._completion(body)), "application/json")
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from bench.corpus import make_corpus
+    ap = argparse.ArgumentParser(description="serve a synthetic corpus until Ctrl-C")
+    ap.add_argument("--docs", type=int, default=500)
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--llm-latency", type=float, default=0.0)
+    a = ap.parse_args()
+    s = BenchServer(make_corpus(a.docs), a.llm_latency, port=a.port).start()
+    for src in s.sources():
+        print(src["source_id"], src["url"])
+    print(f"OpenAI endpoint: AZURE_OPENAI_ENDPOINT={s.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        s.stop()
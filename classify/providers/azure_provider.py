@@ -1,11 +1,23 @@
-import os, json
-from .base import Classifier
+import os, json, asyncio, threading, weakref
+from typing import Dict, List
+from .base import Classifier, ERROR_RESULT
+from .throttle import RateLimiter, estimate_tokens, acomplete, llm_call
+from common.llm_cache import open_cache, make_key, prompt_version
 
 # Optional: pip install openai==1.* tenacity
 try:
-    from openai import AzureOpenAI
+    from openai import AzureOpenAI, AsyncAzureOpenAI
 except Exception:
-    AzureOpenAI = None  # so imports don't break when you don't have it yet
+    AzureOpenAI = AsyncAzureOpenAI = None  # so imports don't break when you don't have it yet
+
+# batch throughput knobs: in-flight requests and the deployment's quota (0 = unlimited)
+CONCURRENCY = int(os.environ.get("AZURE_OPENAI_CONCURRENCY", "8"))
+RPM = int(os.environ.get("AZURE_OPENAI_RPM", "0"))
+TPM = int(os.environ.get("AZURE_OPENAI_TPM", "0"))
+
+# packed mode: up to PACK_SIZE articles per request, within a PACK_TOKENS prompt budget
+PACK_SIZE = int(os.environ.get("AZURE_OPENAI_PACK_SIZE", "1"))   # 1 = one article per request
+PACK_TOKENS = int(os.environ.get("AZURE_OPENAI_PACK_TOKENS", "6000"))
 
 SYSTEM_PROMPT = """You are a cautious maritime risk analyst. Decide if the text describes a real maritime incident.
 Incident types ONLY: "grounding","collision","fire","piracy","weather","port_closure","strike","spill".
@@ -17,6 +29,11 @@ Return STRICT JSON only:
 { "is_incident": <bool>, "incident_types": <array>, "near_miss": <bool>, "confidence": <0..1>, "rationale": "<≤12 words>" }
 """
 
+PACKED_PROMPT = SYSTEM_PROMPT.split("Return STRICT JSON only:")[0] + """You get a JSON array of items {"id": <int>, "text": <str>}. Judge each item on its own text only.
+Return STRICT JSON only, one result per item, same ids:
+{ "results": [ { "id": <int>, "is_incident": <bool>, "incident_types": <array>, "near_miss": <bool>, "confidence": <0..1>, "rationale": "<≤12 words>" } ] }
+"""
+
 ALLOWED = {"grounding","collision","fire","piracy","weather","port_closure","strike","spill"}
 
 def _coerce_bool(x):
@@ -25,6 +42,8 @@ def _coerce_bool(x):
     return False
 
 def _sanitize(d):
+    if not isinstance(d, dict):
+        raise ValueError("answer is not a JSON object")
     types = [t for t in d.get("incident_types", []) if t in ALLOWED]
     out = {
         "is_incident": _coerce_bool(d.get("is_incident", False)),
@@ -39,28 +58,192 @@ def _sanitize(d):
         out["confidence"] = min(out["confidence"], 0.5)
     return out
 
+def _messages(text):
+    return [
+        {"role":"system","content":SYSTEM_PROMPT},
+        {"role":"user","content":f"Text:\n{text or ''}"}
+    ]
+
+def _packed_messages(texts):
+    items = [{"id": i, "text": t or ""} for i, t in enumerate(texts)]
+    return [
+        {"role":"system","content":PACKED_PROMPT},
+        {"role":"user","content":json.dumps(items, ensure_ascii=False)}
+    ]
+
+def make_packs(texts, size=PACK_SIZE, budget=PACK_TOKENS):
+    """Greedy split of indexes into packs of ≤size items within ~budget prompt tokens."""
+    packs, cur, used = [], [], estimate_tokens(PACKED_PROMPT, completion=0)
+    for i, t in enumerate(texts):
+        cost = estimate_tokens(t, completion=0) + 10  # + JSON framing
+        if cur and (len(cur) >= size or used + cost > budget):
+            packs.append(cur)
+            cur, used = [], estimate_tokens(PACKED_PROMPT, completion=0)
+        cur.append(i)
+        used += cost
+    if cur:
+        packs.append(cur)
+    return packs
+
+def _parse_packed(content, n):
+    """id → raw result dict for every well-formed item in a packed answer."""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return {}
+    rows = data.get("results") if isinstance(data, dict) else data
+    out = {}
+    for r in rows if isinstance(rows, list) else []:
+        if isinstance(r, dict) and isinstance(r.get("id"), int) and 0 <= r["id"] < n and "is_incident" in r:
+            out[r["id"]] = {k: v for k, v in r.items() if k != "id"}
+    return out
+
 class AzureOpenAIClassifier(Classifier):
     def __init__(self):
         if AzureOpenAI is None:
             raise RuntimeError("openai client not installed; pip install openai")
-        self.client = AzureOpenAI(
+        self.client_kwargs = dict(
             azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
             api_key=os.environ["AZURE_OPENAI_API_KEY"],
             api_version=os.environ.get("AZURE_OPENAI_API_VERSION","2024-10-21"),
         )
+        self.client = AzureOpenAI(**self.client_kwargs)
         self.deployment = os.environ["AZURE_OPENAI_DEPLOYMENT"]
+        self.limiter = RateLimiter(RPM, TPM)
+        self.cache = open_cache("classify.provider", prompt_version(SYSTEM_PROMPT + PACKED_PROMPT))
+        # event loop → (async client, semaphore): each classify_batch() runs its
+        # own loop, so concurrent calls from several threads never share them
+        self._async = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        return f"azure:{self.deployment}:{prompt_version(SYSTEM_PROMPT)}"
+
+    def _cached(self, text, prompt=SYSTEM_PROMPT):
+        """(key, sanitized result or None); an entry that no longer sanitizes counts as a miss."""
+        if self.cache is None:
+            return None, None
+        key = make_key(prompt, self.deployment, 0.0, text or "")
+        content = self.cache.get(key)
+        if content is None:
+            return key, None
+        try:
+            return key, _sanitize(json.loads(content))
+        except (TypeError, ValueError):
+            self.cache.delete(key)
+            return key, None
+
+    def _finish(self, key, text, content, prompt=SYSTEM_PROMPT):
+        out = _sanitize(json.loads(content))  # only answers that sanitize get cached
+        if key is not None:
+            self.cache.put(key, content, len(prompt) + len(text or ""))
+        return out
 
     def classify(self, text: str):
-        resp = self.client.chat.completions.create(
-            model=self.deployment,
-            temperature=0.0,
-            response_format={"type":"json_object"},
-            messages=[
-                {"role":"system","content":SYSTEM_PROMPT},
-                {"role":"user","content":f"Text:\n{text or ''}"}
-            ],
-            timeout=30,
-        )
-        data = json.loads(resp.choices[0].message.content)
-        return _sanitize(data)
+        key, hit = self._cached(text)
+        if hit is not None:
+            return hit
+        with llm_call("azure_provider"):
+            resp = self.client.chat.completions.create(
+                model=self.deployment,
+                temperature=0.0,
+                response_format={"type":"json_object"},
+                messages=_messages(text),
+                timeout=30,
+            )
+        return self._finish(key, text, resp.choices[0].message.content)
+
+    def _async_state(self):
+        # httpx clients and semaphores are tied to one event loop
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            state = self._async.get(loop)
+            if state is None:
+                state = self._async[loop] = (AsyncAzureOpenAI(**self.client_kwargs), asyncio.Semaphore(CONCURRENCY))
+        return state
+
+    async def _acomplete(self, messages, tokens: int, timeout: float = 30) -> str:
+        client, sem = self._async_state()
+        async with sem:
+            return await acomplete(client.chat.completions.create, self.limiter, tokens, "azure_provider",
+                                   model=self.deployment,
+                                   temperature=0.0,
+                                   response_format={"type":"json_object"},
+                                   messages=messages,
+                                   timeout=timeout)
+
+    async def aclassify(self, text: str) -> Dict:
+        key, hit = self._cached(text)
+        if hit is not None:
+            return hit
+        content = await self._acomplete(_messages(text), estimate_tokens(SYSTEM_PROMPT, text))
+        return self._finish(key, text, content)
+
+    async def aclassify_packed(self, texts: List[str]) -> List[Dict]:
+        """Classify several texts in one request. Items missing from a malformed
+        or partial answer are retried one by one through aclassify(); a request
+        that fails outright (e.g. still rate limited after the retries) raises."""
+        results = [None] * len(texts)
+        todo = []
+        for i, t in enumerate(texts):
+            key, hit = self._cached(t, PACKED_PROMPT)
+            if hit is not None:
+                results[i] = hit
+            else:
+                todo.append((i, key))
+        if len(todo) == 1:
+            results[todo[0][0]] = await self.aclassify(texts[todo[0][0]])
+        elif todo:
+            pack = [texts[i] for i, _ in todo]
+            content = await self._acomplete(
+                _packed_messages(pack),
+                estimate_tokens(PACKED_PROMPT, *pack, completion=40 * len(pack)),
+                timeout=30 + 5 * len(pack))
+            parsed = _parse_packed(content, len(pack))
+            for j, (i, key) in enumerate(todo):
+                if j in parsed:
+                    try:
+                        results[i] = self._finish(key, texts[i], json.dumps(parsed[j]), PACKED_PROMPT)
+                    except (TypeError, ValueError):
+                        pass  # e.g. non-numeric confidence → retried alone below
+            missing = [i for i, _ in todo if results[i] is None]
+            for i, r in zip(missing, await asyncio.gather(*(self.aclassify(texts[i]) for i in missing))):
+                results[i] = r
+        return results
+
+    async def _classify_all(self, texts):
+        async def one(t):
+            try:
+                return await self.aclassify(t)
+            except Exception:
+                return dict(ERROR_RESULT)
+
+        async def pack(idx):
+            # no fan-out to single requests here: that would multiply the load
+            # by the pack size just when the endpoint is throttling or failing
+            try:
+                return await self.aclassify_packed([texts[i] for i in idx])
+            except Exception:
+                return [dict(ERROR_RESULT) for _ in idx]
+
+        try:
+            if PACK_SIZE <= 1:
+                return await asyncio.gather(*(one(t) for t in texts))
+            packs = make_packs(texts, PACK_SIZE)
+            results = [None] * len(texts)
+            for idx, res in zip(packs, await asyncio.gather(*(pack(p) for p in packs))):
+                for i, r in zip(idx, res):
+                    results[i] = r
+            return results
+        finally:
+            with self._async_lock:
+                state = self._async.pop(asyncio.get_running_loop(), None)
+            if state is not None:
+                await state[0].close()
 
+    def classify_batch(self, texts: List[str]) -> List[Dict]:
+        """Concurrent classification (AZURE_OPENAI_CONCURRENCY in flight, throttled
+        to AZURE_OPENAI_RPM / AZURE_OPENAI_TPM). With AZURE_OPENAI_PACK_SIZE > 1,
+        several articles share each request. Failed items get ERROR_RESULT."""
+        return asyncio.run(self._classify_all(texts))
@@ -1,7 +1,17 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List
+
+# what a provider reports for a doc it could not classify
+ERROR_RESULT = {"is_incident": False, "incident_types": [], "near_miss": False,
+                "confidence": 0.0, "rationale": "error"}
 
 class Classifier(ABC):
+    @property
+    def version(self) -> str:
+        """Identifies what produced a result; a change marks old outputs stale."""
+        return type(self).__name__
+
     @abstractmethod
     def classify(self, text: str) -> Dict:
         """Return dict with keys:
@@ -10,3 +20,14 @@ class Classifier(ABC):
         """
         ...
 
+    def classify_batch(self, texts: List[str]) -> List[Dict]:
+        """Classify many texts; results come back in input order.
+
+        Default is a serial loop; network-bound providers override this to
+        run requests concurrently.
+        """
+        return [self.classify(t) for t in texts]
+
+    async def aclassify(self, text: str) -> Dict:
+        """Async entry point. Default runs classify() in a worker thread."""
+        return await asyncio.to_thread(self.classify, text)
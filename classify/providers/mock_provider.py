@@ -1,5 +1,5 @@
-import re
-from typing import Dict, List
+import re, hashlib
+from typing import Dict, List, Set
 from .base import Classifier
 
 ALLOWED = {"grounding","collision","fire","piracy","weather","port_closure","strike","spill"}
@@ -21,23 +21,37 @@ TYPES = {
 # Non-incident gate—policy/market ops without incident cues
 R_NONINCIDENT = re.compile(r"\b(sanction|share[s]? (?:hit|falls?)|fee|tariff|earnings|forecast|production|contract|order book|IPO)\b", re.I)
 
-def _match_types(text: str) -> List[str]:
-    labels = []
-    for k, pat in TYPES.items():
-        if re.search(pat, text, re.I):
-            labels.append(k)
+# Single-pass matcher: one alternation with a named group per type plus the
+# near-miss and non-incident cues. R_INCIDENT is exactly the union of TYPES,
+# and no keyword contains another group's keyword, so one finditer() sees
+# every cue the separate searches would.
+R_ALL = re.compile("|".join(
+    [f"(?P<{k}>{pat})" for k, pat in TYPES.items()] +
+    [f"(?P<near_miss>{R_NEARMISS.pattern})", f"(?P<non_incident>{R_NONINCIDENT.pattern})"]
+), re.I)
+
+def _scan(text: str) -> Set[str]:
+    return {m.lastgroup for m in R_ALL.finditer(text)}
+
+def _match_types(text: str, hits: Set[str] | None = None) -> List[str]:
+    hits = _scan(text) if hits is None else hits
     # keep only allowed, keep stable order
-    return [t for t in labels if t in ALLOWED]
+    return [k for k in TYPES if k in hits and k in ALLOWED]
 
 class MockClassifier(Classifier):
+    @property
+    def version(self) -> str:
+        return "mock:" + hashlib.sha256(R_ALL.pattern.encode()).hexdigest()[:12]
+
     def classify(self, text: str) -> Dict:
         t = text or ""
-        is_incident = bool(R_INCIDENT.search(t))
-        near_miss = bool(R_NEARMISS.search(t)) and is_incident
-        labels = _match_types(t) if is_incident else []
+        hits = _scan(t)
+        labels = _match_types(t, hits)
+        is_incident = bool(labels)
+        near_miss = "near_miss" in hits and is_incident
 
         # If it looks like policy/market and no incident keywords → force non-incident
-        if not labels and R_NONINCIDENT.search(t):
+        if not labels and "non_incident" in hits:
             is_incident = False
             near_miss = False
 
@@ -54,3 +68,5 @@ class MockClassifier(Classifier):
             "rationale": rationale[:60]
         }
 
+    def classify_many(self, texts: List[str]) -> List[Dict]:
+        return self.classify_batch(texts)
@@ -0,0 +1,117 @@
+import asyncio, threading, time
+from contextlib import contextmanager
+
+from common import metrics
+
+LLM_SECONDS = metrics.histogram("llm_request_seconds", "LLM round-trips, by caller")
+LLM_REQUESTS = metrics.counter("llm_requests_total", "LLM requests, by caller and outcome")
+LLM_INFLIGHT = metrics.gauge("llm_inflight", "LLM requests awaiting an answer, by caller")
+THROTTLE_SECONDS = metrics.histogram("llm_throttle_wait_seconds", "Time held back by the rate limiter")
+
+RATE_LIMIT_RETRIES = 3
+
+class RateLimiter:
+    """Token buckets for requests/min and tokens/min, shared by async callers.
+
+    0 disables a limit. State is plain numbers behind a thread lock (no asyncio
+    primitives), so one limiter can outlive the event loops that use it and be
+    shared by loops running on several threads.
+    """
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm, self.tpm = rpm, tpm
+        self.req_tokens = float(rpm)
+        self.tok_tokens = float(tpm)
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        dt, self.stamp = now - self.stamp, now
+        if self.rpm:
+            self.req_tokens = min(self.rpm, self.req_tokens + dt * self.rpm / 60.0)
+        if self.tpm:
+            self.tok_tokens = min(self.tpm, self.tok_tokens + dt * self.tpm / 60.0)
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = max(0.0, self.paused_until - time.monotonic())
+        if self.rpm and self.req_tokens < 1:
+            wait = max(wait, (1 - self.req_tokens) * 60.0 / self.rpm)
+        if self.tpm:
+            need = min(tokens, self.tpm)  # a single oversized request still goes through
+            if self.tok_tokens < need:
+                wait = max(wait, (need - self.tok_tokens) * 60.0 / self.tpm)
+        return wait
+
+    async def acquire(self, tokens: int = 0):
+        t0 = time.perf_counter()
+        while True:
+            with self._lock:
+                self._refill()
+                wait = self._wait_time(tokens)
+                if wait <= 0:
+                    if self.rpm: self.req_tokens -= 1
+                    if self.tpm: self.tok_tokens -= min(tokens, self.tpm)
+            if wait <= 0:
+                THROTTLE_SECONDS.observe(time.perf_counter() - t0)
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. after a 429 with Retry-After."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def estimate_tokens(*texts: str, completion: int = 60) -> int:
+    # ~4 chars per token is close enough for budgeting
+    return sum(len(t or "") for t in texts) // 4 + completion
+
+
+@contextmanager
+def llm_call(caller: str):
+    """Time, count and track one LLM request; works around sync and awaited calls alike."""
+    LLM_INFLIGHT.inc(caller=caller)
+    t0, outcome = time.perf_counter(), "error"
+    try:
+        yield
+        outcome = "ok"
+    except Exception as e:
+        if rate_limited(e):
+            outcome = "rate_limited"
+        raise
+    finally:
+        LLM_INFLIGHT.dec(caller=caller)
+        LLM_SECONDS.observe(time.perf_counter() - t0, caller=caller)
+        LLM_REQUESTS.inc(caller=caller, outcome=outcome)
+
+
+def rate_limited(err) -> bool:
+    # openai.RateLimitError without importing openai (it's optional here)
+    return type(err).__name__ == "RateLimitError" or getattr(err, "status_code", None) == 429
+
+
+async def acomplete(create, limiter: RateLimiter, tokens: int, caller: str,
+                    retries: int = RATE_LIMIT_RETRIES, **request) -> str:
+    """One chat completion through the limiter; returns the message content.
+
+    A 429 pauses every caller sharing the limiter for its Retry-After, not just
+    this one, then the request is retried (up to `retries` times)."""
+    for attempt in range(retries + 1):
+        await limiter.acquire(tokens)
+        try:
+            with llm_call(caller):
+                resp = await create(**request)
+            return resp.choices[0].message.content
+        except Exception as e:
+            if not rate_limited(e) or attempt == retries:
+                raise
+            limiter.pause(retry_after(e))
+
+
+def retry_after(err, default: float = 5.0) -> float:
+    resp = getattr(err, "response", None)
+    try:
+        return float(resp.headers.get("retry-after"))
+    except Exception:
+        return default
@@ -1,53 +1,108 @@
 
-import os, glob, json, sys
+import os, json, sys, argparse
 from pathlib import Path
 sys.path.append(os.path.dirname(__file__))
 
 
 from .providers.mock_provider import MockClassifier
+from .providers.base import ERROR_RESULT
+from common import metrics, profiling
+from common.manifest import Manifest, content_hash
+from common.docstore import open_store
+
+# docs handed to the provider per classify_batch() call
+BATCH_SIZE = int(os.environ.get("CLASSIFY_BATCH", "64"))
+
+CLASSIFIED = metrics.counter("classify_docs_total", "Docs classified, by result (incident/other/error)")
+BATCH_SECONDS = metrics.histogram("classify_batch_seconds", "One classify_batch() call, by provider")
 
 def get_provider():
     provider = os.environ.get("LLM_PROVIDER","mock").lower()
     if provider == "azure":
         from providers.azure_provider import AzureOpenAIClassifier
-        return AzureOpenAIClassifier()
-    return MockClassifier()
+        clf = AzureOpenAIClassifier()
+    else:
+        clf = MockClassifier()
+    return profiling.instrument(clf, "classify", "aclassify", describe=lambda a, kw, r: profiling.text_info(a[0]))
+
+def doc_text(doc) -> str:
+    return f"{doc.get('title','')}\n{(doc.get('content_text','') or '')[:1000]}"
+
+def doc_hash(doc) -> str:
+    return content_hash(doc_text(doc), doc.get("canonical_id") or "")
+
+def make_output(doc, res) -> dict:
+    # every classification result passes through here (batch run and pipeline)
+    CLASSIFIED.inc(result="error" if res == ERROR_RESULT else "incident" if res.get("is_incident") else "other")
+    return {
+        "doc_id": doc["doc_id"],
+        "url": doc.get("url",""),
+        "title": doc.get("title",""),
+        "published_at": doc.get("published_at",""),
+        **res
+    }
 
-def run(in_dir="../data/normalized", out_dir="../data/classified"):
+def classify_docs(clf, docs):
+    texts = [doc_text(d) for d in docs]
+    with profiling.naming(zip(texts, (d["doc_id"] for d in docs))), \
+            BATCH_SECONDS.time(provider=type(clf).__name__):
+        return clf.classify_batch(texts)
+
+def run(in_dir="../data/normalized", out_dir="../data/classified", full=False, store=None):
+    """Classify new or changed docs; full=True reclassifies everything.
+
+    in_dir/out_dir only apply to the folder backend (DOC_STORE=folder).
+    """
     # Allow running from repo root or from classify/ dir
     here = Path(__file__).parent
     in_path  = (here / in_dir).resolve()
     out_path = (here / out_dir).resolve()
-    out_path.mkdir(parents=True, exist_ok=True)
+    if store is None:
+        store = open_store(root=out_path.parent, dirs={"normalized": in_path, "classified": out_path})
 
     clf = get_provider()
-    files = glob.glob(str(in_path / "*.json"))
-    total, incidents = 0, 0
-    for f in files:
-        with open(f, "r", encoding="utf-8") as fh:
-            doc = json.load(fh)
-        title = doc.get("title","")
-        content = (doc.get("content_text","") or "")[:1000]
-        text = f"{title}\n{content}"
-
-        res = clf.classify(text)
-        out = {
-            "doc_id": doc["doc_id"],
-            "url": doc.get("url",""),
-            "title": title,
-            "published_at": doc.get("published_at",""),
-            **res
-        }
-        out_file = out_path / f"{doc['doc_id']}.classify.json"
-        with open(out_file, "w", encoding="utf-8") as oh:
-            json.dump(out, oh, ensure_ascii=False, indent=2)
-
-        total += 1
-        incidents += int(res["is_incident"])
+    manifest = Manifest(out_path.parent / "manifests" / "classify.json", clf.version)
+    stamps = store.stamps("normalized")
+    doc_ids = list(stamps)
+    total, incidents, unchanged = 0, 0, 0
+    for i in range(0, len(doc_ids), BATCH_SIZE):
+        todo = [d for d in doc_ids[i:i + BATCH_SIZE] if full or not manifest.unchanged(d, stamps[d])]
+        unchanged += min(BATCH_SIZE, len(doc_ids) - i) - len(todo)
+        docs = []
+        for key, doc in store.get_many("normalized", todo).items():
+            chash = doc_hash(doc)
+            if not full and manifest.current(key, chash):
+                manifest.record(key, chash, stamps[key])  # touched but same content
+                unchanged += 1; continue
+            # near-duplicate of another doc → that one is the story's representative
+            if doc.get("canonical_id", doc["doc_id"]) != doc["doc_id"]:
+                manifest.record(key, chash, stamps[key])
+                continue
+            docs.append((key, chash, doc))
+
+        results = classify_docs(clf, [d for _, _, d in docs]) if docs else []
+        outs = []
+        for (key, chash, doc), res in zip(docs, results):
+            outs.append(make_output(doc, res))
+            total += 1
+            incidents += int(res["is_incident"])
+        store.put_many("classified", outs)
+        for (key, chash, doc), res in zip(docs, results):
+            if res != ERROR_RESULT:  # failures get another try next run
+                manifest.record(key, chash, stamps[key])
+        manifest.save()
 
     print(f"[LLM_PROVIDER={os.environ.get('LLM_PROVIDER','mock')}] "
-          f"Classified {total} docs → {out_path} | incidents: {incidents}")
+          f"Classified {total} docs → {type(store).__name__} | incidents: {incidents} | unchanged: {unchanged}")
+    if getattr(clf, "cache", None) is not None:
+        print(clf.cache.report())
 
 if __name__ == "__main__":
-    run()
-
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="reclassify every doc, ignoring the manifest")
+    profiling.add_argument(ap)
+    a = ap.parse_args()
+    metrics.setup()
+    profiling.setup("classify", a.profile)
+    with profiling.stage("classify"):
+        run(full=a.full)
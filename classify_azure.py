@@ -1,16 +1,26 @@
-import os, json, glob
-from pathlib import Path
-from tenacity import retry, stop_after_attempt, wait_exponential
-from openai import AzureOpenAI
+import os, json, asyncio, argparse
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from openai import AzureOpenAI, AsyncAzureOpenAI
+from classify.providers.base import ERROR_RESULT
+from classify.providers.throttle import RateLimiter, estimate_tokens, acomplete, llm_call, rate_limited
+from common.llm_cache import open_cache, make_key, prompt_version
+from common.docstore import open_store
+from common import metrics, profiling
 
-client = AzureOpenAI(
+CLIENT_KWARGS = dict(
     azure_endpoint=os.environ["AZURE_OPENAI_ENDPOINT"],
     api_key=os.environ["AZURE_OPENAI_API_KEY"],
     api_version=os.environ.get("AZURE_OPENAI_API_VERSION","2024-10-21"),
 )
+client = AzureOpenAI(**CLIENT_KWARGS)
 
 DEPLOYMENT = os.environ["AZURE_OPENAI_DEPLOYMENT"]
 
+# in-flight requests and the deployment's quota (0 = unlimited)
+CONCURRENCY = int(os.environ.get("AZURE_OPENAI_CONCURRENCY", "8"))
+RPM = int(os.environ.get("AZURE_OPENAI_RPM", "0"))
+TPM = int(os.environ.get("AZURE_OPENAI_TPM", "0"))
+
 SYSTEM_PROMPT = """You are a cautious maritime risk analyst. Decide if the text describes a real maritime incident.
 Incident types ONLY: "grounding","collision","fire","piracy","weather","port_closure","strike","spill".
 Rules:
@@ -29,6 +39,8 @@ def _bool(x):
     return False
 
 def _sanitize(d):
+    if not isinstance(d, dict):
+        raise ValueError("answer is not a JSON object")
     types = [t for t in d.get("incident_types", []) if t in ALLOWED]
     out = {
         "is_incident": _bool(d.get("is_incident", False)),
@@ -43,9 +55,62 @@ def _sanitize(d):
         out["confidence"] = min(out["confidence"], 0.5)
     return out
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=6))
+cache = open_cache("classify_azure", prompt_version(SYSTEM_PROMPT))
+
+def _cache_key(text: str):
+    return make_key(SYSTEM_PROMPT, DEPLOYMENT, 0.0, text) if cache else None
+
+def _from_cache(key):
+    content = cache.get(key) if key else None
+    if content is None:
+        return None
+    try:
+        return _sanitize(json.loads(content))
+    except (TypeError, ValueError):  # stored before answers were checked → ask again
+        cache.delete(key)
+        return None
+
+def _store(key, text, content):
+    out = _sanitize(json.loads(content))  # only answers that sanitize get cached
+    if key:
+        cache.put(key, content, len(SYSTEM_PROMPT) + len(text))
+    return out
+
+@profiling.hot("classify_text", lambda a, kw, r: profiling.text_info(a[0]))
 def classify_text(text: str) -> dict:
-    resp = client.chat.completions.create(
+    key = _cache_key(text)
+    hit = _from_cache(key)
+    return hit if hit is not None else _store(key, text, _classify_remote(text))
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=6))
+def _classify_remote(text: str) -> str:
+    with llm_call("classify_azure"):
+        resp = client.chat.completions.create(
+            model=DEPLOYMENT,
+            temperature=0.0,
+            response_format={"type":"json_object"},
+            messages=[
+                {"role":"system","content":SYSTEM_PROMPT},
+                {"role":"user","content":f"Text:\n{text}"}
+            ],
+            timeout=30,
+        )
+    content = resp.choices[0].message.content
+    json.loads(content)  # malformed → let tenacity retry
+    return content
+
+@profiling.hot("aclassify_text", lambda a, kw, r: profiling.text_info(a[1]))
+async def aclassify_text(aclient, text: str, limiter: RateLimiter) -> dict:
+    key = _cache_key(text)
+    hit = _from_cache(key)
+    return hit if hit is not None else _store(key, text, await _aclassify_remote(aclient, text, limiter))
+
+# 429s are retried inside acomplete(), which also pauses the shared limiter
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=6),
+       retry=retry_if_exception(lambda e: not rate_limited(e)))
+async def _aclassify_remote(aclient, text: str, limiter: RateLimiter) -> str:
+    content = await acomplete(
+        aclient.chat.completions.create, limiter, estimate_tokens(SYSTEM_PROMPT, text), "classify_azure",
         model=DEPLOYMENT,
         temperature=0.0,
         response_format={"type":"json_object"},
@@ -55,23 +120,32 @@ def classify_text(text: str) -> dict:
         ],
         timeout=30,
     )
-    data = json.loads(resp.choices[0].message.content)
-    return _sanitize(data)
+    json.loads(content)  # malformed → let tenacity retry
+    return content
 
-def run(in_dir="data/normalized", out_dir="data/classified"):
-    Path(out_dir).mkdir(parents=True, exist_ok=True)
-    files = glob.glob(f"{in_dir}/*.json")
-    total, incidents = 0, 0
-    for f in files:
-        with open(f, "r", encoding="utf-8") as fh:
-            doc = json.load(fh)
+async def _run(store):
+    # CONCURRENCY workers share one iterator over the ids, so only that many docs
+    # are in flight at once; store I/O runs on threads to keep the loop free
+    doc_ids = iter(await asyncio.to_thread(store.ids, "normalized"))
+    limiter = RateLimiter(RPM, TPM)
+    aclient = AsyncAzureOpenAI(**CLIENT_KWARGS)
+    outs = []
+
+    async def one(doc_id):
+        doc = await asyncio.to_thread(store.get, "normalized", doc_id)
+        if doc is None:
+            return None
+        # near-duplicate of another doc → that one is the story's representative
+        if doc.get("canonical_id", doc["doc_id"]) != doc["doc_id"]:
+            return None
         title = doc.get("title","")
         content = (doc.get("content_text","") or "")[:1000]
         text = f"{title}\n{content}"
-        try:
-            res = classify_text(text)
-        except Exception as e:
-            res = {"is_incident": False, "incident_types": [], "near_miss": False, "confidence": 0.0, "rationale": "error"}
+        with profiling.naming([(text, doc["doc_id"])]):
+            try:
+                res = await aclassify_text(aclient, text, limiter)
+            except Exception:
+                res = dict(ERROR_RESULT)
         out = {
             "doc_id": doc["doc_id"],
             "url": doc.get("url",""),
@@ -79,12 +153,36 @@ def run(in_dir="data/normalized", out_dir="data/classified"):
             "published_at": doc.get("published_at",""),
             **res
         }
-        with open(Path(out_dir)/f"{doc['doc_id']}.classify.json","w",encoding="utf-8") as oh:
-            json.dump(out, oh, ensure_ascii=False, indent=2)
-        total += 1
-        incidents += int(out["is_incident"])
+        await asyncio.to_thread(store.put, "classified", out)
+        return out
+
+    async def worker():
+        for doc_id in doc_ids:
+            out = await one(doc_id)
+            if out:
+                outs.append(out)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    finally:
+        await aclient.close()
+    return outs
+
+def run(in_dir="data/normalized", out_dir="data/classified"):
+    # in_dir/out_dir only apply to the folder backend (DOC_STORE=folder)
+    store = open_store(dirs={"normalized": in_dir, "classified": out_dir})
+    outs = asyncio.run(_run(store))
+    total = len(outs)
+    incidents = sum(int(o["is_incident"]) for o in outs)
     print(f"Classified {total} docs → {out_dir} | incidents: {incidents}")
+    if cache:
+        print(cache.report())
 
 if __name__ == "__main__":
-    run()
-
+    ap = argparse.ArgumentParser()
+    profiling.add_argument(ap)
+    a = ap.parse_args()
+    metrics.setup()
+    profiling.setup("classify_azure", a.profile)
+    with profiling.stage("classify_azure"):
+        run()
@@ -0,0 +1,23 @@
+# atomic file writes: readers see the old file or the new one, never half of one
+
+import json, os, tempfile
+from pathlib import Path
+
+
+def write_text_atomic(path, text: str):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_json_atomic(path, obj, indent=2):
+    write_text_atomic(path, json.dumps(obj, ensure_ascii=False, indent=indent))
@@ -0,0 +1,78 @@
+# benchmark: folder-per-doc layout vs single-file SQLite store
+#
+#   python -m common.bench_docstore [--docs N] [--lookups N]
+#
+# Writes N synthetic normalized docs into a temp dir for each backend, then
+# times a full scan (stamps + read every body) and random point lookups.
+
+import argparse, random, statistics, sys, tempfile, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.docstore import FolderStore, SQLiteStore
+
+WORDS = ("vessel port cargo tanker grounding collision fire crew harbour pilot berth "
+         "anchorage coast guard container bulk carrier tug salvage channel draft").split()
+
+
+def synthetic_docs(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    for i in range(n):
+        body = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(150, 600)))
+        yield {"doc_id": f"{i:016x}", "source_id": f"src{i % 12}", "url": f"https://example.test/{i}",
+               "title": " ".join(rnd.choice(WORDS) for _ in range(8)).title(),
+               "published_at": f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00Z",
+               "lang": "en", "content_text": body}
+
+
+def _time(fn, repeat=3):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return min(runs)
+
+
+def bench(store, docs, lookups):
+    t0 = time.perf_counter()
+    store.put_many("normalized", docs)
+    write = time.perf_counter() - t0
+
+    def scan():
+        ids = list(store.stamps("normalized"))
+        assert len(store.get_many("normalized", ids)) == len(docs)
+
+    ids = [d["doc_id"] for d in random.Random(1).choices(docs, k=lookups)]
+    lat = []
+    for d in ids:
+        t1 = time.perf_counter()
+        store.get("normalized", d)
+        lat.append((time.perf_counter() - t1) * 1e6)
+    lat.sort()
+    return {"write_s": write, "stamps_s": _time(lambda: store.stamps("normalized")),
+            "scan_s": _time(scan), "get_p50_us": statistics.median(lat),
+            "get_p95_us": lat[int(0.95 * (len(lat) - 1))]}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=5000)
+    ap.add_argument("--lookups", type=int, default=2000)
+    a = ap.parse_args()
+
+    docs = list(synthetic_docs(a.docs))
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "folder": bench(FolderStore(root=Path(tmp) / "folder"), docs, a.lookups),
+            "sqlite": bench(SQLiteStore(path=Path(tmp) / "docs.sqlite"), docs, a.lookups),
+        }
+    print(f"{a.docs} docs, {a.lookups} point lookups")
+    print(f"{'backend':<8} {'write s':>9} {'stamps s':>9} {'scan s':>9} {'get p50 µs':>11} {'get p95 µs':>11}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['write_s']:9.3f} {r['stamps_s']:9.3f} {r['scan_s']:9.3f} "
+              f"{r['get_p50_us']:11.1f} {r['get_p95_us']:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# data/catalog.jsonl: append-safe writes + a sidecar SQLite index
+#
+# The JSONL file stays the source of truth (one line per ingested doc). Writers
+# append whole batches under an exclusive flock, so concurrent ingest runs
+# never interleave lines. The index (catalog.idx.sqlite) maps doc_id / url /
+# source_id / published time → byte offset and is brought up to date
+# incrementally: only bytes past the last indexed offset are read.
+#
+#   python -m common.catalog --source gcaptain_rss --since 2025-10-01
+#   python -m common.catalog --url https://...       # exit 1 if unknown
+#   python -m common.catalog --rebuild
+
+import argparse, json, os, sqlite3, sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still single write() calls
+    fcntl = None
+
+ROOT = Path(__file__).resolve().parents[1]
+CATALOG = ROOT / "data" / "catalog.jsonl"
+
+
+def _ts(value) -> float | None:
+    """ISO timestamp (any offset) → UTC epoch seconds, so 'since' compares correctly."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class Catalog:
+    def __init__(self, path: Path = CATALOG, index_path: Path | None = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path = Path(index_path or self.path.with_suffix(".idx.sqlite"))
+        self._pending = []
+        # callers sharing one Catalog across threads serialize their calls (Ingestor._lock)
+        self.db = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);
+            CREATE TABLE IF NOT EXISTS lines (
+                offset INTEGER PRIMARY KEY, doc_id TEXT, url TEXT, source_id TEXT,
+                published_at TEXT, published_ts REAL, canonical_id TEXT);
+            CREATE INDEX IF NOT EXISTS lines_doc ON lines(doc_id);
+            CREATE INDEX IF NOT EXISTS lines_url ON lines(url);
+            CREATE INDEX IF NOT EXISTS lines_source ON lines(source_id, published_ts);
+        """)
+
+    # ---- writes ----
+
+    def append(self, row: dict):
+        """Buffer a line; written by the next flush()."""
+        self._pending.append(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        if not self._pending:
+            return
+        data = "".join(self._pending).encode("utf-8")
+        with open(self.path, "ab") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # released on close
+            f.write(data)  # one write, under the lock → lines never interleave
+            f.flush()
+        self._pending = []
+        self.refresh()
+
+    # ---- index ----
+
+    def _meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def refresh(self, rebuild: bool = False) -> int:
+        """Index lines appended since the last call; returns how many were added."""
+        if not self.path.exists():
+            return 0
+        st = os.stat(self.path)
+        if not rebuild and self._meta("inode") == st.st_ino and self._meta("offset") == st.st_size:
+            return 0  # nothing appended: skip the write transaction
+        self.db.execute("BEGIN IMMEDIATE")  # one indexer at a time across processes
+        try:
+            offset = self._meta("offset", 0)
+            # rewritten / truncated / replaced file → start over
+            if rebuild or self._meta("inode") != st.st_ino or st.st_size < offset:
+                self.db.execute("DELETE FROM lines")
+                offset = 0
+            rows = []
+            if st.st_size > offset:
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    for raw in f:
+                        if not raw.endswith(b"\n"):
+                            break  # a writer is mid-append; pick it up next time
+                        try:
+                            r = json.loads(raw)
+                        except ValueError:
+                            r = None
+                        if isinstance(r, dict):
+                            rows.append((offset, r.get("doc_id"), r.get("url"), r.get("source_id"),
+                                         r.get("published_at"), _ts(r.get("published_at")),
+                                         r.get("canonical_id")))
+                        offset += len(raw)
+            self.db.executemany("INSERT OR REPLACE INTO lines VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                [("offset", offset), ("inode", st.st_ino)])
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    # ---- queries ----
+
+    def _read(self, offsets):
+        out = []
+        with open(self.path, "rb") as f:
+            for off in offsets:
+                f.seek(off)
+                out.append(json.loads(f.readline()))
+        return out
+
+    def has_url(self, url: str) -> bool:
+        self.refresh()
+        return self.db.execute("SELECT 1 FROM lines WHERE url = ? LIMIT 1", (url,)).fetchone() is not None
+
+    def get(self, doc_id: str) -> dict | None:
+        self.refresh()
+        row = self.db.execute("SELECT offset FROM lines WHERE doc_id = ? ORDER BY offset DESC LIMIT 1",
+                              (doc_id,)).fetchone()
+        return self._read([row[0]])[0] if row else None
+
+    def by_source(self, source_id: str, since=None) -> list[dict]:
+        """Lines from one source, oldest first; since is an ISO date/time or epoch seconds."""
+        self.refresh()
+        q, args = "SELECT offset FROM lines WHERE source_id = ?", [source_id]
+        if since is not None:
+            q += " AND published_ts >= ?"
+            args.append(since if isinstance(since, (int, float)) else _ts(since))
+        q += " ORDER BY published_ts, offset"
+        return self._read([o for (o,) in self.db.execute(q, args)])
+
+    def count(self) -> int:
+        self.refresh()
+        return self.db.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="query the ingest catalog")
+    ap.add_argument("--path", default=str(CATALOG))
+    ap.add_argument("--source")
+    ap.add_argument("--since", help="ISO date/time, used with --source")
+    ap.add_argument("--url")
+    ap.add_argument("--doc")
+    ap.add_argument("--rebuild", action="store_true", help="re-index the whole file")
+    a = ap.parse_args()
+
+    cat = Catalog(Path(a.path))
+    if a.rebuild:
+        print(f"indexed {cat.refresh(rebuild=True)} lines")
+    if a.url:
+        found = cat.has_url(a.url)
+        print("known" if found else "unknown")
+        sys.exit(0 if found else 1)
+    rows = cat.by_source(a.source, a.since) if a.source else [cat.get(a.doc)] if a.doc else []
+    for r in rows:
+        if r:
+            print(json.dumps(r, ensure_ascii=False))
+    if not (a.source or a.doc or a.rebuild):
+        print(f"{cat.count()} lines indexed")
@@ -0,0 +1,242 @@
+# document storage backends for the pipeline stages
+#
+# Every stage reads and writes docs by (kind, doc_id), where kind is one of
+# "normalized", "classified", "extracted". Two backends:
+#
+#   FolderStore  – the original layout: one pretty-printed JSON file per doc
+#                  under data/<kind>/ (default, keeps existing data usable)
+#   SQLiteStore  – a single indexed file (data/docs.sqlite, WAL mode)
+#
+# Pick one with DOC_STORE=folder|sqlite. Migrate / export:
+#
+#   python -m common.docstore migrate                # folders → sqlite
+#   python -m common.docstore export-parquet classified out.parquet
+
+import argparse, json, os, sqlite3, threading, time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from common.atomic import write_json_atomic
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA = ROOT / "data"
+BACKEND = os.environ.get("DOC_STORE", "folder").lower()
+SQLITE_PATH = Path(os.environ.get("DOC_STORE_PATH", DATA / "docs.sqlite"))
+
+# kind -> file suffix in the folder layout
+KINDS = {"normalized": ".json", "classified": ".classify.json", "extracted": ".extract.json"}
+
+
+class DocStore(ABC):
+    @abstractmethod
+    def get(self, kind: str, doc_id: str) -> dict | None: ...
+
+    @abstractmethod
+    def put(self, kind: str, doc: dict): ...
+
+    @abstractmethod
+    def exists(self, kind: str, doc_id: str) -> bool: ...
+
+    @abstractmethod
+    def stamps(self, kind: str) -> dict:
+        """doc_id → opaque change marker, for every doc of a kind (one call, no body reads)."""
+
+    def stamp(self, kind: str, doc_id: str):
+        """The stamps() marker of one doc (None if missing)."""
+        return self.stamps(kind).get(doc_id)
+
+    def ids(self, kind: str):
+        return list(self.stamps(kind))
+
+    def get_many(self, kind: str, doc_ids) -> dict:
+        out = {}
+        for d in doc_ids:
+            doc = self.get(kind, d)
+            if doc is not None:
+                out[d] = doc
+        return out
+
+    def put_many(self, kind: str, docs):
+        for d in docs:
+            self.put(kind, d)
+
+    def iter(self, kind: str):
+        for d in self.ids(kind):
+            doc = self.get(kind, d)
+            if doc is not None:
+                yield doc
+
+    def close(self):
+        pass
+
+
+class FolderStore(DocStore):
+    def __init__(self, root: Path = DATA, dirs: dict | None = None):
+        self.dirs = {k: Path(root) / k for k in KINDS}
+        self.dirs.update({k: Path(v) for k, v in (dirs or {}).items()})
+        for p in self.dirs.values():
+            p.mkdir(parents=True, exist_ok=True)
+
+    def path(self, kind: str, doc_id: str) -> Path:
+        return self.dirs[kind] / f"{doc_id}{KINDS[kind]}"
+
+    def get(self, kind, doc_id):
+        try:
+            with open(self.path(kind, doc_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, kind, doc):
+        write_json_atomic(self.path(kind, doc["doc_id"]), doc)
+
+    def exists(self, kind, doc_id):
+        return self.path(kind, doc_id).exists()
+
+    def stamps(self, kind):
+        suffix, out = KINDS[kind], {}
+        with os.scandir(self.dirs[kind]) as it:
+            for e in it:
+                doc_id = e.name[:-len(suffix)]
+                # doc ids have no dots: skips "x.classify.json" strays and temp files
+                if e.name.endswith(suffix) and doc_id and "." not in doc_id:
+                    st = e.stat()
+                    out[doc_id] = [st.st_mtime_ns, st.st_size]
+        return out
+
+    def stamp(self, kind, doc_id):
+        try:
+            st = os.stat(self.path(kind, doc_id))
+        except FileNotFoundError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+
+class SQLiteStore(DocStore):
+    def __init__(self, path: Path = SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS docs (
+            kind TEXT NOT NULL, doc_id TEXT NOT NULL, body TEXT NOT NULL, updated_at REAL NOT NULL,
+            PRIMARY KEY (kind, doc_id)) WITHOUT ROWID""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS docs_updated ON docs(kind, updated_at)")
+
+    def get(self, kind, doc_id):
+        with self._lock:
+            row = self.db.execute("SELECT body FROM docs WHERE kind = ? AND doc_id = ?",
+                                  (kind, doc_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, kind, doc_ids):
+        doc_ids, out = list(doc_ids), {}
+        with self._lock:
+            for i in range(0, len(doc_ids), 500):  # stay under SQLite's bound-variable limit
+                chunk = doc_ids[i:i + 500]
+                q = f"SELECT doc_id, body FROM docs WHERE kind = ? AND doc_id IN ({','.join('?' * len(chunk))})"
+                out.update((d, json.loads(b)) for d, b in self.db.execute(q, [kind, *chunk]))
+        return out
+
+    def put(self, kind, doc):
+        self.put_many(kind, [doc])
+
+    def put_many(self, kind, docs):
+        rows = [(kind, d["doc_id"], json.dumps(d, ensure_ascii=False), time.time()) for d in docs]
+        with self._lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)", rows)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def exists(self, kind, doc_id):
+        with self._lock:
+            return self.db.execute("SELECT 1 FROM docs WHERE kind = ? AND doc_id = ?",
+                                   (kind, doc_id)).fetchone() is not None
+
+    def stamps(self, kind):
+        with self._lock:
+            return dict(self.db.execute("SELECT doc_id, updated_at FROM docs WHERE kind = ?", (kind,)))
+
+    def stamp(self, kind, doc_id):
+        with self._lock:
+            row = self.db.execute("SELECT updated_at FROM docs WHERE kind = ? AND doc_id = ?",
+                                  (kind, doc_id)).fetchone()
+        return row[0] if row else None
+
+    def iter(self, kind, page: int = 500):
+        # keyset pages: only one page in memory, and the lock isn't held while
+        # the caller works (it may write to this store between docs)
+        last = ""
+        while True:
+            with self._lock:
+                rows = self.db.execute("SELECT doc_id, body FROM docs WHERE kind = ? AND doc_id > ? "
+                                       "ORDER BY doc_id LIMIT ?", (kind, last, page)).fetchall()
+            for _, body in rows:
+                yield json.loads(body)
+            if len(rows) < page:
+                return
+            last = rows[-1][0]
+
+    def close(self):
+        self.db.close()
+
+
+def open_store(backend: str | None = None, **kw) -> DocStore:
+    """Backend from DOC_STORE unless given. Folder-only options (root, dirs)
+    are ignored by SQLite and vice versa (path), so callers can pass both."""
+    backend = (backend or BACKEND).lower()
+    if backend == "sqlite":
+        return SQLiteStore(**{k: v for k, v in kw.items() if k == "path"})
+    if backend == "folder":
+        return FolderStore(**{k: v for k, v in kw.items() if k in ("root", "dirs")})
+    raise ValueError(f"unknown DOC_STORE backend: {backend!r}")
+
+
+def migrate(src: DocStore, dst: DocStore, batch: int = 500) -> dict:
+    counts = {}
+    for kind in KINDS:
+        buf, n = [], 0
+        for doc in src.iter(kind):
+            buf.append(doc)
+            if len(buf) >= batch:
+                dst.put_many(kind, buf); n += len(buf); buf = []
+        if buf:
+            dst.put_many(kind, buf); n += len(buf)
+        counts[kind] = n
+    return counts
+
+
+def export_parquet(store: DocStore, kind: str, out: Path):
+    import pandas as pd  # needs pyarrow (or fastparquet) installed
+    rows = []
+    for doc in store.iter(kind):
+        # lists/dicts become JSON strings so the column types stay flat
+        rows.append({k: json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+                     for k, v in doc.items()})
+    pd.DataFrame(rows).to_parquet(out, index=False)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="document store maintenance")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="copy every doc from one backend to another")
+    m.add_argument("--from", dest="src", default="folder")
+    m.add_argument("--to", dest="dst", default="sqlite")
+    e = sub.add_parser("export-parquet", help="dump one kind to a Parquet file")
+    e.add_argument("kind", choices=sorted(KINDS))
+    e.add_argument("out")
+    a = ap.parse_args()
+
+    if a.cmd == "migrate":
+        counts = migrate(open_store(a.src), open_store(a.dst))
+        print(" | ".join(f"{k}: {n}" for k, n in counts.items()) + f"  ({a.src} → {a.dst})")
+    else:
+        n = export_parquet(open_store(), a.kind, Path(a.out))
+        print(f"exported {n} {a.kind} docs → {a.out}")
@@ -0,0 +1,122 @@
+# shared HTTP transport: one pooled keep-alive session with retries and size caps
+#
+# Used by ingest (articles, feeds, listing pages) and providers/llm_client, so
+# repeated requests to the same news domains / LLM endpoint reuse connections.
+
+import os, random, threading, time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from common import metrics
+
+POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "32"))      # hosts kept in the pool cache
+POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "8"))         # keep-alive connections per host
+RETRIES = int(os.environ.get("HTTP_RETRIES", "3"))
+BACKOFF = float(os.environ.get("HTTP_BACKOFF", "0.5"))         # 0.5, 1, 2, ... seconds
+JITTER = float(os.environ.get("HTTP_JITTER", "0.5"))           # + uniform(0, JITTER) seconds
+RETRY_AFTER_MAX = float(os.environ.get("HTTP_RETRY_AFTER_MAX", "5"))  # longer Retry-After: give up
+MAX_BYTES = int(os.environ.get("HTTP_MAX_BYTES", str(5 * 1024 * 1024)))
+RETRY_STATUS = (429, 500, 502, 503, 504)
+USER_AGENT = "Mozilla/5.0"
+
+HTTP_SECONDS = metrics.histogram("http_request_seconds", "HTTP request time incl. body read (after retries)")
+HTTP_RESPONSES = metrics.counter("http_responses_total", "HTTP responses by method and status code")
+HTTP_ERRORS = metrics.counter("http_errors_total", "HTTP requests that raised, by exception type")
+HTTP_INFLIGHT = metrics.gauge("http_inflight_requests", "HTTP requests in flight")
+
+
+class ResponseTooLarge(requests.RequestException):
+    pass
+
+
+class _JitterRetry(Retry):
+    # urllib3 copies the Retry via new() on every attempt; the copy is still a
+    # _JitterRetry, so the overridden get_backoff_time applies to each retry
+    def get_backoff_time(self):
+        base = super().get_backoff_time()
+        return base + random.uniform(0, JITTER) if base else base
+
+    # the retry sleeps inside the caller's request, i.e. while it holds its
+    # host slot; a server asking for more than RETRY_AFTER_MAX gets its 429/503
+    # handed back instead (raise_on_status=False), and the next poll retries
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        wait = self.get_retry_after(response) if response is not None else None
+        if wait is not None and wait > RETRY_AFTER_MAX:
+            raise MaxRetryError(_pool, url, ResponseError(f"Retry-After {wait:g}s > {RETRY_AFTER_MAX:g}s"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def _build_session() -> requests.Session:
+    retry = _JitterRetry(
+        total=RETRIES, connect=RETRIES, read=RETRIES, status=RETRIES,
+        backoff_factor=BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET", "HEAD", "POST"}),  # LLM calls are POSTs
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=retry)
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers["User-Agent"] = USER_AGENT
+    return s
+
+
+_session = None
+_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def request(method: str, url: str, max_bytes: int | None = MAX_BYTES, timeout=20, **kw) -> requests.Response:
+    """Send a request through the shared session, reading at most max_bytes of body."""
+    host = urlparse(url).hostname or ""
+    t0 = time.perf_counter()
+    with HTTP_INFLIGHT.track():
+        try:
+            r = _send(method, url, max_bytes, timeout, **kw)
+        except Exception as e:
+            HTTP_ERRORS.inc(method=method, host=host, error=type(e).__name__)
+            raise
+        finally:
+            HTTP_SECONDS.observe(time.perf_counter() - t0, method=method, host=host)
+    HTTP_RESPONSES.inc(method=method, host=host, code=r.status_code)
+    return r
+
+
+def _send(method, url, max_bytes, timeout, **kw):
+    r = get_session().request(method, url, timeout=timeout, stream=True, **kw)
+    if max_bytes is None:
+        r.content  # read it all and release the connection
+        return r
+    try:
+        declared = int(r.headers.get("Content-Length") or 0)
+        if declared > max_bytes:
+            raise ResponseTooLarge(f"{url}: {declared} bytes > cap {max_bytes}", response=r)
+        buf = bytearray()
+        for chunk in r.iter_content(64 * 1024):
+            buf += chunk
+            if len(buf) > max_bytes:
+                raise ResponseTooLarge(f"{url}: body exceeds cap {max_bytes}", response=r)
+    except Exception:
+        r.close()
+        raise
+    r._content = bytes(buf)  # so .text / .json() work as usual
+    return r
+
+
+def get(url: str, **kw) -> requests.Response:
+    return request("GET", url, **kw)
+
+
+def post(url: str, **kw) -> requests.Response:
+    return request("POST", url, **kw)
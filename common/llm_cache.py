@@ -0,0 +1,143 @@
+# content-addressed, size-bounded on-disk cache for LLM responses
+#
+# Key = sha256(system prompt, model/deployment, temperature, input). Entries
+# live in one SQLite file; least-recently-used rows are evicted past a size cap.
+# The running byte total sits in a one-row meta table next to them, so every
+# process and instance sharing the file sees the same figure.
+
+import hashlib, json, os, sqlite3, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+
+from common import metrics
+
+ROOT = Path(__file__).resolve().parents[1]
+ENABLED = os.environ.get("LLM_CACHE", "1") not in ("0", "false", "no")
+PATH = Path(os.environ.get("LLM_CACHE_PATH", ROOT / "data" / "cache" / "llm.sqlite"))
+MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+LOOKUPS = metrics.counter("llm_cache_lookups_total", "LLM cache lookups by namespace and result")
+
+
+def make_key(system: str, model: str, temperature: float, text: str) -> str:
+    blob = json.dumps([system, model, float(temperature), text], ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def prompt_version(system: str) -> str:
+    return hashlib.sha256((system or "").encode("utf-8")).hexdigest()[:16]
+
+
+class LLMCache:
+    """Persistent response cache with hit/miss/bytes-saved counters.
+
+    `namespace` + `version` let a caller drop its stale entries on open, e.g.
+    the classifier passes prompt_version(SYSTEM_PROMPT) so editing the prompt
+    frees the old answers right away (they'd never be hit again anyway,
+    since the prompt is part of the key).
+    """
+
+    def __init__(self, path: Path = PATH, max_bytes: int = MAX_BYTES,
+                 namespace: str = "default", version: str = ""):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.namespace, self.version = namespace, version
+        self.hits = self.misses = self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY, namespace TEXT, version TEXT,
+            value TEXT, size INTEGER, saved INTEGER, last_used REAL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache(last_used)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER)")
+        with self._write():
+            # seeds the total for files written before the meta table existed
+            self.db.execute("INSERT OR IGNORE INTO meta SELECT 0, COALESCE(SUM(size), 0) FROM cache")
+            stale = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ? AND version != ?",
+                                    (namespace, version)).fetchone()[0]
+            self.db.execute("DELETE FROM cache WHERE namespace = ? AND version != ?", (namespace, version))
+            self._add(-stale)
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so the total we read
+        # can't move under us before the matching rows change
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _add(self, delta: int) -> int:
+        self.db.execute("UPDATE meta SET total = total + ? WHERE id = 0", (delta,))
+        return self.total
+
+    @property
+    def total(self) -> int:
+        return self.db.execute("SELECT total FROM meta WHERE id = 0").fetchone()[0]
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self.db.execute("SELECT value, saved FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                LOOKUPS.inc(namespace=self.namespace, result="miss")
+                return None
+            self.db.execute("UPDATE cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            LOOKUPS.inc(namespace=self.namespace, result="hit")
+            self.bytes_saved += row[1]
+            return row[0]
+
+    def put(self, key: str, value: str, request_bytes: int = 0):
+        """Store a response; request_bytes is what a hit avoids sending."""
+        size = len(value.encode("utf-8"))
+        with self._lock, self._write():
+            old = self.db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, self.namespace, self.version, value, size,
+                             size + request_bytes, time.time()))
+            total = self._add(size - (old[0] if old else 0))
+            if total > self.max_bytes:
+                self._evict(total)
+
+    def delete(self, key: str):
+        """Drop an entry, e.g. one the caller can no longer use."""
+        with self._lock, self._write():
+            old = self.db.execute("SELECT size FROM cache WHERE key = ?", (key,)).fetchone()
+            if old:
+                self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._add(-old[0])
+
+    def _evict(self, total: int):
+        # drop LRU rows until we're back under 90% of the cap; runs inside
+        # put()'s write transaction, so `total` is current for the whole file
+        target = int(self.max_bytes * 0.9)
+        doomed, freed = [], 0
+        for key, size in self.db.execute("SELECT key, size FROM cache ORDER BY last_used"):
+            if total - freed <= target:
+                break
+            doomed.append((key,))
+            freed += size
+        self.db.executemany("DELETE FROM cache WHERE key = ?", doomed)
+        self._add(-freed)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes_saved": self.bytes_saved,
+                "entries": self.db.execute("SELECT COUNT(*) FROM cache").fetchone()[0],
+                "bytes": self.total}
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"llm cache: hits={s['hits']} misses={s['misses']} "
+                f"saved={s['bytes_saved'] / 1024:.1f} KiB | {s['entries']} entries, "
+                f"{s['bytes'] / 1024 / 1024:.1f} MiB")
+
+
+def open_cache(namespace: str = "default", version: str = "") -> LLMCache | None:
+    """The shared cache, or None when LLM_CACHE=0."""
+    return LLMCache(namespace=namespace, version=version) if ENABLED else None
@@ -0,0 +1,45 @@
+# per-stage manifest: which inputs were processed, at what content hash and stage version
+#
+# Lets a stage skip docs it has already handled. Two levels:
+#   unchanged(): the inputs' store stamps (DocStore.stamps) and the stage version
+#                match → skip without reading
+#   current():   content hash and version match → skip after reading (e.g. file was touched)
+
+import hashlib, json, os
+from pathlib import Path
+
+
+def content_hash(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update((p or "").encode("utf-8", "ignore"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, path: Path, version: str):
+        self.path = Path(path)
+        self.version = version
+        self.entries = {}
+        if self.path.exists():
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def unchanged(self, key: str, *stamps) -> bool:
+        e = self.entries.get(key)
+        if not e or e.get("version") != self.version:
+            return False
+        return None not in stamps and e.get("stamp") == list(stamps)
+
+    def current(self, key: str, chash: str) -> bool:
+        e = self.entries.get(key)
+        return bool(e) and e.get("version") == self.version and e.get("hash") == chash
+
+    def record(self, key: str, chash: str, *stamps):
+        self.entries[key] = {"hash": chash, "version": self.version, "stamp": list(stamps)}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.entries))
+        os.replace(tmp, self.path)
@@ -0,0 +1,245 @@
+# in-process metrics: counters, gauges and latency histograms for every stage
+#
+# Metrics live in one registry per process. Stages declare them at import time
+# and update them inline; nothing is sent anywhere unless asked:
+#
+#   METRICS_PORT=9108     serve /metrics (Prometheus text) and /metrics.json
+#   METRICS_FILE=x.json   write the JSON snapshot when the process exits
+#   METRICS_PROM_FILE=p   ... and/or Prometheus text (node_exporter textfile dir)
+#
+# Entry points call metrics.setup() once. Worker processes (extract's process
+# pool) keep their own registry, which is not merged back.
+#
+#   FETCHED = metrics.counter("ingest_articles_fetched_total", "Article pages fetched")
+#   FETCHED.inc()
+#   with HTTP_SECONDS.time(host="gcaptain.com"): ...
+
+import atexit, json, os, threading, time
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+# seconds; covers sub-ms regex work up to slow LLM round-trips
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_registry = {}
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def prometheus(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            for key, v in sorted(self.values.items()):
+                lines.append(f"{self.name}{_fmt_labels(key)} {v:g}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(k), "value": v} for k, v in sorted(self.values.items())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, n: float = 1, **labels):
+        k = _key(labels)
+        with self._lock:
+            self.values[k] = self.values.get(k, 0) + n
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, v: float, **labels):
+        with self._lock:
+            self.values[_key(labels)] = v
+
+    def inc(self, n: float = 1, **labels):
+        k = _key(labels)
+        with self._lock:
+            self.values[k] = self.values.get(k, 0) + n
+
+    def dec(self, n: float = 1, **labels):
+        self.inc(-n, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """In-flight count for the duration of the block."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, v: float, **labels):
+        k = _key(labels)
+        with self._lock:
+            h = self.values.get(k)
+            if h is None:
+                h = self.values[k] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, b in enumerate(self.buckets):
+                if v <= b:
+                    h["counts"][i] += 1
+                    break
+            h["sum"] += v
+            h["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def prometheus(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, h in sorted(self.values.items()):
+                cum = 0
+                for b, c in zip(self.buckets, h["counts"]):
+                    cum += c
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', f'{b:g}'),))} {cum}")
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {h['count']}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {h['sum']:g}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {h['count']}")
+        return lines
+
+    def snapshot(self):
+        out = []
+        with self._lock:
+            for k, h in sorted(self.values.items()):
+                out.append({"labels": dict(k), "count": h["count"], "sum": round(h["sum"], 6),
+                            "mean": round(h["sum"] / h["count"], 6) if h["count"] else None,
+                            "p50": self._quantile(h, 0.5), "p99": self._quantile(h, 0.99),
+                            "buckets": dict(zip(map(str, self.buckets), h["counts"]))})
+        return out
+
+    def _quantile(self, h, q):
+        # upper bound of the bucket holding the q-th observation (what Prometheus would estimate)
+        target, cum = q * h["count"], 0
+        for b, c in zip(self.buckets, h["counts"]):
+            cum += c
+            if cum >= target and c:
+                return b
+        return None if not h["count"] else float("inf")
+
+
+def _get(cls, name, help, **kw):
+    with _lock:
+        m = _registry.get(name)
+        if m is None:
+            m = _registry[name] = cls(name, help, **kw)
+        elif not isinstance(m, cls):
+            raise ValueError(f"metric {name} already registered as {m.kind}")
+        return m
+
+
+def counter(name: str, help: str) -> Counter:
+    return _get(Counter, name, help)
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _get(Gauge, name, help)
+
+
+def histogram(name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get(Histogram, name, help, buckets=buckets)
+
+
+# ---- export ----
+
+def prometheus_text() -> str:
+    with _lock:
+        metrics = list(_registry.values())
+    return "\n".join(line for m in sorted(metrics, key=lambda m: m.name) for line in m.prometheus()) + "\n"
+
+
+def snapshot() -> dict:
+    with _lock:
+        metrics = list(_registry.values())
+    return {"time": time.time(), "pid": os.getpid(),
+            "metrics": {m.name: {"type": m.kind, "help": m.help, "values": m.snapshot()}
+                        for m in sorted(metrics, key=lambda m: m.name)}}
+
+
+def write(json_path=None, prom_path=None):
+    from common.atomic import write_text_atomic
+    if json_path:
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(json_path, json.dumps(snapshot(), indent=2, default=str))
+    if prom_path:
+        Path(prom_path).parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(prom_path, prometheus_text())
+
+
+def serve(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                body, ctype = prometheus_text(), "text/plain; version=0.0.4; charset=utf-8"
+            elif path == "/metrics.json":
+                body, ctype = json.dumps(snapshot(), default=str), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+_setup_done = False
+
+def setup():
+    """Start the exporter / exit-time dump configured by METRICS_* env vars."""
+    global _setup_done
+    if _setup_done:
+        return
+    _setup_done = True
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        serve(int(port))
+        print(f"metrics on :{port}/metrics")
+    json_path, prom_path = os.environ.get("METRICS_FILE"), os.environ.get("METRICS_PROM_FILE")
+    if json_path or prom_path:
+        atexit.register(write, json_path, prom_path)
@@ -0,0 +1,315 @@
+# opt-in profiling for the batch stages: cProfile, tracemalloc, a stack
+# sampler, and slow per-doc outliers
+#
+#   PROFILE=cprofile,tracemalloc,sample,slow   (or "all"; entry points also take --profile)
+#   PROFILE_DIR=data/profiles   PROFILE_SLOW_MS=250   PROFILE_TOP=30   PROFILE_SAMPLE_MS=5
+#
+# Off by default; a hot() wrapper then costs one set lookup per call. Each run
+# writes <dir>/<name>-<stamp>.* at exit:
+#   .prof        merged cProfile stats (python -m pstats / snakeviz)
+#   .txt         summary: stages, top functions, top allocators, sampled hot
+#                spots, per-function timings, slowest docs
+#   .slow.jsonl  every hot() call over PROFILE_SLOW_MS, written as it happens
+#   .stacks      sampled stacks in collapsed form (flamegraph.pl / speedscope)
+#
+# Up to Python 3.11 cProfile follows one thread per profiler: stage() profiles
+# the calling thread and hot() functions running on worker threads get a
+# per-thread profiler. From 3.12 cProfile sits on sys.monitoring, which covers
+# every thread but admits one profiler per process, so a single profiler runs
+# from setup() to dump(). The sampler sees every thread. Process-pool workers
+# are not covered.
+
+import atexit, contextvars, cProfile, functools, heapq, inspect, io, json, os, pstats, sys, threading, time, tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+MODES = ("cprofile", "tracemalloc", "sample", "slow")
+DIR = Path(os.environ.get("PROFILE_DIR", ROOT / "data" / "profiles"))
+SLOW_MS = float(os.environ.get("PROFILE_SLOW_MS", "250"))
+TOP = int(os.environ.get("PROFILE_TOP", "30"))
+SAMPLE_MS = float(os.environ.get("PROFILE_SAMPLE_MS", "5"))
+PROCESS_WIDE = sys.version_info >= (3, 12)
+
+_modes = frozenset()
+_lock = threading.Lock()
+_local = threading.local()
+_state = {}
+
+
+def parse_modes(spec: str | None) -> frozenset:
+    parts = {p.strip().lower() for p in (spec or "").split(",") if p.strip()}
+    if parts & {"1", "all", "true", "yes"}:
+        return frozenset(MODES)
+    unknown = parts - set(MODES) - {"0", "false", "no", "off"}
+    if unknown:
+        raise ValueError(f"unknown profiling mode(s) {sorted(unknown)}; choose from {MODES} or 'all'")
+    return frozenset(parts & set(MODES))
+
+
+def enabled(mode: str | None = None) -> bool:
+    return bool(_modes) if mode is None else mode in _modes
+
+
+def add_argument(ap):
+    ap.add_argument("--profile", default=os.environ.get("PROFILE", ""), metavar="MODES",
+                    help=f"comma list of {','.join(MODES)} or 'all' (results in {DIR})")
+
+
+def setup(name: str, modes: str | None = None):
+    """Switch profiling on for this process (modes default to $PROFILE) and dump at exit."""
+    global _modes
+    wanted = parse_modes(os.environ.get("PROFILE") if modes is None else modes)
+    if not wanted or _modes:
+        return
+    DIR.mkdir(parents=True, exist_ok=True)
+    base = DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    _state.update(base=base, stages=[], profiles=[], funcs={}, slowest=[], slow_file=None,
+                  samples=Counter(), stacks=Counter(), n_samples=0, stop=threading.Event())
+    if "tracemalloc" in wanted and not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+    if "slow" in wanted:
+        _state["slow_file"] = open(f"{base}.slow.jsonl", "a", encoding="utf-8", buffering=1)
+    _modes = wanted
+    if "cprofile" in wanted and PROCESS_WIDE:
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+            _state["profiles"].append(prof)
+        except ValueError as e:  # another profiling tool is already active
+            print(f"profiling: cProfile off ({e})")
+    if "sample" in wanted:
+        threading.Thread(target=_sampler, name="profiling-sampler", daemon=True).start()
+    atexit.register(dump)
+    print(f"profiling ({','.join(sorted(wanted))}) → {base}.*")
+
+
+# ---- stages and hot functions ----
+
+@contextmanager
+def stage(name: str):
+    """Profile a whole stage run on the calling thread (wall time, tracemalloc peak, cProfile)."""
+    if not _modes:
+        yield
+        return
+    if "tracemalloc" in _modes:
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        with _profiled():
+            yield
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None
+        with _lock:
+            _state["stages"].append({"stage": name, "seconds": round(time.perf_counter() - t0, 3),
+                                     "peak_mb": round(peak / 2**20, 1) if peak is not None else None})
+
+
+def hot(name: str, describe=None):
+    """Decorator for per-document functions. describe(args, kwargs, result) -> dict
+    names the doc (doc_id, text_len, ...) in slow-outlier records."""
+    def wrap(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def awrapper(*args, **kwargs):
+                if not _modes:
+                    return await fn(*args, **kwargs)
+                t0 = time.perf_counter()
+                result = await fn(*args, **kwargs)  # interleaved with other tasks: no cProfile here
+                _observe(name, time.perf_counter() - t0, describe, args, kwargs, result)
+                return result
+            return awrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _modes:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            with _profiled():
+                result = fn(*args, **kwargs)
+            _observe(name, time.perf_counter() - t0, describe, args, kwargs, result)
+            return result
+        return wrapper
+    return wrap
+
+
+def instrument(obj, *methods, describe=None):
+    """Wrap bound methods of one object with hot() (no-op when profiling is off)."""
+    if _modes:
+        for m in methods:
+            setattr(obj, m, hot(f"{type(obj).__name__}.{m}", describe)(getattr(obj, m)))
+    return obj
+
+
+@contextmanager
+def _profiled():
+    """cProfile the calling thread for the block (up to 3.11), unless nested
+    hot() calls or stage() already have a profiler running on it."""
+    prof = None
+    if "cprofile" in _modes and not PROCESS_WIDE and sys.getprofile() is None:
+        prof = getattr(_local, "profiler", None)
+        if prof is None:
+            prof = _local.profiler = cProfile.Profile()
+            with _lock:
+                _state["profiles"].append(prof)
+        try:
+            prof.enable()
+        except ValueError:  # another profiling tool is already active
+            prof = None
+    try:
+        yield
+    finally:
+        if prof:
+            prof.disable()
+
+
+# ---- naming docs by their text ----
+# Per-doc functions often only see the text; callers that know the doc_id
+# name it inside a naming() block (only while "slow" is on) so outliers can be
+# traced back. The names live in a context variable and go away with the
+# block, so texts that never reach a hot() function (packed LLM requests,
+# process-pool workers) don't pile up. Identical texts queue their doc_ids and
+# each text_info(pop=True) takes the next one.
+
+_names = contextvars.ContextVar("profiling_names", default=None)
+
+
+@contextmanager
+def naming(pairs=()):
+    """Scope for name_text(); pairs are (text, doc_id) to name up front."""
+    if "slow" not in _modes:
+        yield
+        return
+    token = _names.set({})
+    try:
+        for text, doc_id in pairs:
+            name_text(text, doc_id)
+        yield
+    finally:
+        _names.reset(token)
+
+
+def name_text(text: str, doc_id: str):
+    names = _names.get()
+    if names is not None and text:
+        names.setdefault(text, []).append(doc_id)
+
+
+def text_info(text: str, pop: bool = True) -> dict:
+    text = text or ""
+    ids = (_names.get() or {}).get(text)
+    if not ids:
+        doc_id = None
+    elif pop:
+        doc_id = ids.pop(0)
+        if not ids:
+            del _names.get()[text]
+    else:
+        doc_id = ids[0]
+    return {"doc_id": doc_id, "text_len": len(text)}
+
+
+def _observe(name, seconds, describe, args, kwargs, result):
+    info = None
+    if "slow" in _modes:
+        try:
+            info = describe(args, kwargs, result) if describe else {}
+        except Exception as e:
+            info = {"describe_error": repr(e)}
+    with _lock:
+        f = _state["funcs"].setdefault(name, [0, 0.0, 0.0])
+        f[0] += 1; f[1] += seconds; f[2] = max(f[2], seconds)
+        if info is None:
+            return
+        rec = {"fn": name, "ms": round(seconds * 1000, 2), **info}
+        if len(_state["slowest"]) < TOP:
+            heapq.heappush(_state["slowest"], (seconds, id(rec), rec))
+        elif seconds > _state["slowest"][0][0]:
+            heapq.heapreplace(_state["slowest"], (seconds, id(rec), rec))
+        if seconds * 1000 >= SLOW_MS and _state["slow_file"]:
+            _state["slow_file"].write(json.dumps({"time": time.time(), **rec}, default=str) + "\n")
+
+
+# ---- sampler ----
+
+def _sampler():
+    me = threading.get_ident()
+    while not _state["stop"].wait(SAMPLE_MS / 1000):
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            stack = []
+            while frame is not None and len(stack) < 64:
+                co = frame.f_code
+                stack.append(f"{Path(co.co_filename).name}:{co.co_name}")
+                frame = frame.f_back
+            if stack:
+                with _lock:
+                    _state["samples"][stack[0]] += 1
+                    _state["stacks"][";".join(reversed(stack))] += 1
+                    _state["n_samples"] += 1
+
+
+# ---- output ----
+
+def dump():
+    if not _modes:
+        return
+    _state["stop"].set()
+    base = _state["base"]
+    if PROCESS_WIDE:
+        for p in _state["profiles"]:
+            p.disable()
+    out = io.StringIO()
+    with _lock:
+        stages, funcs = list(_state["stages"]), dict(_state["funcs"])
+        slowest = sorted(_state["slowest"], reverse=True)
+
+    if stages:
+        out.write("== stages ==\n")
+        for s in stages:
+            peak = f"   peak {s['peak_mb']} MB" if s["peak_mb"] is not None else ""
+            out.write(f"  {s['stage']:<30} {s['seconds']:>10.2f}s{peak}\n")
+
+    profiles = [p for p in _state["profiles"] if p.getstats()]
+    if profiles:
+        stats = pstats.Stats(profiles[0], stream=out)
+        for p in profiles[1:]:
+            stats.add(p)
+        stats.dump_stats(f"{base}.prof")
+        out.write(f"\n== cProfile: top {TOP} by cumulative time ({len(profiles)} thread(s)) ==\n")
+        stats.sort_stats("cumulative").print_stats(TOP)
+
+    if tracemalloc.is_tracing():
+        cur, peak = tracemalloc.get_traced_memory()
+        out.write(f"\n== tracemalloc: now {cur / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB; top {TOP} allocators ==\n")
+        for st in tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]).statistics("lineno")[:TOP]:
+            out.write(f"  {st.size / 1024:>10.1f} KiB {st.count:>8} blocks  {st.traceback[0]}\n")
+
+    if _state["n_samples"]:
+        n = _state["n_samples"]
+        out.write(f"\n== sampled hot spots ({n} samples every {SAMPLE_MS:g} ms, all threads) ==\n")
+        for fn, c in _state["samples"].most_common(TOP):
+            out.write(f"  {c / n:>6.1%}  {fn}\n")
+        with open(f"{base}.stacks", "w", encoding="utf-8") as f:
+            for stack, c in _state["stacks"].most_common():
+                f.write(f"{stack} {c}\n")
+
+    if funcs:
+        out.write("\n== hot functions ==\n")
+        for name, (n, total, mx) in sorted(funcs.items(), key=lambda kv: -kv[1][1]):
+            out.write(f"  {name:<30} n {n:>7}  total {total:>9.2f}s  mean {total / n * 1000:>8.2f} ms"
+                      f"  max {mx * 1000:>9.2f} ms\n")
+    if slowest:
+        out.write(f"\n== slowest {len(slowest)} calls (all over {SLOW_MS:g} ms in {base.name}.slow.jsonl) ==\n")
+        for _, _, rec in slowest:
+            out.write("  " + json.dumps(rec, default=str) + "\n")
+
+    with _lock:
+        slow_file, _state["slow_file"] = _state["slow_file"], None
+    if slow_file:
+        slow_file.close()
+    Path(f"{base}.txt").write_text(out.getvalue(), encoding="utf-8")
+    print(f"profile written → {base}.txt")
@@ -0,0 +1,77 @@
+# benchmark: whole-text dateparser (old choose_date) vs candidate-span extraction
+#
+#   python -m extract.bench_dates [--limit N] [--no-spacy]
+
+import argparse, glob, json, statistics, sys, time
+from pathlib import Path
+import dateparser
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from extract.dates import find_date, date_ents, _parse_span
+
+
+def legacy_choose_date(text):
+    dt = dateparser.parse(text, settings={"PREFER_DATES_FROM": "past"})
+    return dt.date().isoformat() if dt else None
+
+
+def _timed(fn, docs):
+    times, hits = [], 0
+    for d in docs:
+        t0 = time.perf_counter()
+        hits += bool(fn(d))
+        times.append(time.perf_counter() - t0)
+    return times, hits
+
+
+def _report(name, times, hits, n):
+    ms = sorted(t * 1000 for t in times)
+    p95 = ms[int(0.95 * (len(ms) - 1))] if ms else 0
+    print(f"{name:<22} mean {statistics.mean(ms):8.2f} ms/doc  p50 {statistics.median(ms):8.2f}  "
+          f"p95 {p95:8.2f}  hit rate {hits}/{n} ({hits / n:.0%})")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--norm-dir", default="data/normalized")
+    ap.add_argument("--limit", type=int, default=0)
+    ap.add_argument("--no-spacy", action="store_true", help="regex candidates only")
+    a = ap.parse_args()
+
+    files = sorted(glob.glob(f"{a.norm_dir}/*.json"))[: a.limit or None]
+    docs = []
+    for f in files:
+        with open(f, "r", encoding="utf-8") as fh:
+            docs.append(json.load(fh))
+    if not docs:
+        print(f"no docs in {a.norm_dir}")
+        return
+
+    ents = {}
+    if not a.no_spacy:
+        from extract.run import get_nlp, nlp_input
+        nlp = get_nlp()
+        for d in docs:
+            title, text = d.get("title", ""), d.get("content_text", "")
+            doc = nlp(nlp_input(title, text))
+            ents[d["doc_id"]] = (date_ents(doc, len(title) + 1), date_ents(doc, 0, len(title)))
+
+    def old(d):
+        return legacy_choose_date(d.get("content_text", "")) or legacy_choose_date(d.get("title", ""))
+
+    def new(d):
+        body_ents, title_ents = ents.get(d["doc_id"], ((), ()))
+        pub = d.get("published_at")
+        return (find_date(d.get("content_text", ""), body_ents, pub)
+                or find_date(d.get("title", ""), title_ents, pub))
+
+    n = len(docs)
+    print(f"{n} docs from {a.norm_dir}" + ("" if a.no_spacy else " (spaCy DATE ents precomputed, not timed)"))
+    _report("whole-text dateparser", *_timed(old, docs), n)
+    _parse_span.cache_clear()
+    _report("candidate spans (cold)", *_timed(new, docs), n)
+    _report("candidate spans (warm)", *_timed(new, docs), n)
+
+
+if __name__ == "__main__":
+    main()
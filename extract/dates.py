@@ -0,0 +1,100 @@
+# fast date extraction: find short candidate spans, parse only those (memoized)
+#
+# dateparser is slow on long inputs and, given a whole article, mostly gives
+# up. Here compiled regexes (and spaCy DATE entities when a Doc is at hand)
+# pick out date-like spans, and only those few short strings are parsed,
+# relative to the article's publish time.
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from dateutil import parser as dtp
+
+from common import metrics
+
+PARSE_SECONDS = metrics.histogram("extract_dateparser_seconds", "dateparser calls (memo misses only)")
+
+# "May" must be capitalised, otherwise "20 may have" reads as a date
+MONTH = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|(?-i:May)|june?|july?|aug(?:ust)?|"
+         r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?")
+WEEKDAY = r"(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+ORD = r"(?:st|nd|rd|th)?"
+
+RE_DATE_SPAN = re.compile("|".join([
+    rf"\b\d{{1,2}}{ORD}\s+(?:of\s+)?{MONTH}(?:,?\s+\d{{4}})?\b",   # 12 March 2024
+    rf"\b{MONTH}\s+\d{{1,2}}{ORD}(?:,?\s+\d{{4}})?\b",              # March 12, 2024
+    rf"\b{MONTH}\s+\d{{4}}\b",                                       # March 2024
+    r"\b\d{4}-\d{2}-\d{2}\b",                                        # 2024-03-12
+    r"\b\d{1,2}/\d{1,2}/\d{2,4}\b",                                  # 12/03/2024
+    rf"\b(?:on|last|this\s+past|early|late)\s+{WEEKDAY}\b",          # on Monday
+    r"\b(?:yesterday|today|last night|this morning)\b",
+    r"\b\d{1,2}\s+days?\s+ago\b",
+]), re.I)
+
+# spaCy DATE entities worth parsing: they must name a day, not just a year or a duration
+RE_DATE_CUE = re.compile(rf"\b(?:{MONTH}|{WEEKDAY}|yesterday|today|ago)\b|\d{{1,2}}[/-]\d{{1,2}}", re.I)
+
+RE_RELATIVE = re.compile(rf"\b(?:{WEEKDAY}|yesterday|today|last night|this morning|ago)\b", re.I)
+
+# names a day and a four-digit year: parses the same whatever the publish time
+RE_FULL_DATE = re.compile(rf"(?=.*\b\d{{4}}\b)(?=.*\b\d{{1,2}}{ORD}\b)")
+
+SETTINGS = {"PREFER_DATES_FROM": "past"}
+
+
+def relative_base(published_at: str | None) -> datetime | None:
+    if not published_at:
+        return None
+    try:
+        return dtp.parse(published_at).replace(tzinfo=None)
+    except Exception:
+        return None
+
+
+def parse_span(span: str, base: datetime | None = None) -> str | None:
+    # only relative or incomplete spans depend on the publish time, and then
+    # only on its day: full dates share one memo entry across all docs
+    day = base.date() if base and (RE_RELATIVE.search(span) or not RE_FULL_DATE.match(span)) else None
+    d = _parse_span(span, day)
+    if not d or (base and d > base.date()):  # reports describe the past
+        return None
+    return d.isoformat()
+
+
+@lru_cache(maxsize=8192)
+def _parse_span(span: str, day: date | None) -> date | None:
+    import dateparser  # slow import; only pay it when there's a span to parse
+    settings = dict(SETTINGS, RELATIVE_BASE=datetime.combine(day, datetime.min.time())) if day else SETTINGS
+    with PARSE_SECONDS.time():
+        dt = dateparser.parse(span, languages=["en"], settings=settings)
+    return dt.date() if dt else None
+
+
+def date_ents(doc, start: int = 0, end: int | None = None):
+    """(offset, text) of spaCy DATE entities within doc.text[start:end], offsets relative to start."""
+    end = len(doc.text) if end is None else end
+    return [(e.start_char - start, e.text) for e in doc.ents
+            if e.label_ == "DATE" and start <= e.start_char and e.end_char <= end]
+
+
+def candidate_spans(text: str, ents=()):
+    """Date-like spans, explicit dates first, each group in text order."""
+    found = [(m.start(), m.group(0)) for m in RE_DATE_SPAN.finditer(text or "")]
+    found += [(off, span) for off, span in ents if RE_DATE_CUE.search(span)]
+    found.sort(key=lambda f: (bool(RE_RELATIVE.search(f[1])), f[0]))
+    seen, out = set(), []
+    for _, span in found:
+        key = span.lower()
+        if key not in seen:
+            seen.add(key); out.append(span)
+    return out
+
+
+def find_date(text: str, ents=(), published_at: str | None = None) -> str | None:
+    """First parseable date in text; ents are (offset, text) pairs from date_ents()."""
+    base = relative_base(published_at)
+    for span in candidate_spans(text, ents):
+        iso = parse_span(" ".join(span.split()), base)
+        if iso:
+            return iso
+    return None
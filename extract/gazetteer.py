@@ -0,0 +1,159 @@
+# gazetteer-backed port / vessel lookup: token trie, one pass over the text
+#
+# Ports come from a UN/LOCODE-style CSV (locode,name,country,aliases with
+# aliases "|"-separated); vessels optionally from name,imo. Names are stored
+# in a trie keyed by lowercased tokens, so matching walks the text once and
+# costs depend on the longest name, not on how many names are loaded.
+# Near misses (e.g. a spaCy GPE spelled slightly differently) fall back to
+# rapidfuzz, run only on names that share enough trigrams with the query to
+# reach the cutoff.
+
+import csv, re
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+PORTS_CSV = ROOT / "data" / "gazetteer" / "ports.csv"
+VESSELS_CSV = ROOT / "data" / "gazetteer" / "vessels.csv"
+
+RE_TOKEN = re.compile(r"[^\W_]+(?:['’.\-][^\W_]+)*")
+WATER_BODIES = {"gulf", "bay", "strait", "straits", "sea"}  # "Gulf of Aden" is not the port
+FUZZY_CUTOFF = 90
+_END = "$"
+
+
+def _tokens(text: str):
+    return [(m.group(0), m.start(), m.end()) for m in RE_TOKEN.finditer(text or "")]
+
+
+def _grams(key: str) -> set:
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    def __init__(self):
+        self.trie = {}
+        self.names = {}  # lowercased name/alias -> record
+        self.by_id = {}  # locode / IMO -> record
+        self._grams = None  # trigram -> names, built on the first fuzzy lookup
+
+    def add(self, name: str, record: dict):
+        toks = [t.lower() for t, _, _ in _tokens(name)]
+        if not toks:
+            return
+        node = self.trie
+        for t in toks:
+            node = node.setdefault(t, {})
+        node.setdefault(_END, record)
+        self.names.setdefault(" ".join(toks), record)
+        self._grams = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def find_all(self, text: str, require_caps: bool = True):
+        """(record, start, end) for every longest, non-overlapping name match."""
+        toks = _tokens(text)
+        out, i = [], 0
+        while i < len(toks):
+            node, hit = self.trie, None
+            for j in range(i, len(toks)):
+                node = node.get(toks[j][0].lower())
+                if node is None:
+                    break
+                if _END in node:
+                    hit = (j, node[_END])
+            if hit and (not require_caps or all(t[0][0].isupper() or t[0][0].isdigit()
+                                                for t in toks[i:hit[0] + 1])) \
+                    and not self._water_body(toks, i):
+                out.append((hit[1], toks[i][1], toks[hit[0]][2]))
+                i = hit[0] + 1
+            else:
+                i += 1
+        return out
+
+    @staticmethod
+    def _water_body(toks, i):
+        return i >= 2 and toks[i - 1][0].lower() == "of" and toks[i - 2][0].lower() in WATER_BODIES
+
+    def first(self, text: str):
+        hits = self.find_all(text)
+        return hits[0][0] if hits else None
+
+    def lookup(self, name: str, fuzzy: bool = True):
+        """Exact (case/spacing-insensitive) lookup, then a rapidfuzz near match."""
+        key = " ".join(t.lower() for t, _, _ in _tokens(name))
+        if key in self.names:
+            return self.names[key]
+        if not fuzzy or not key:
+            return None
+        try:
+            from rapidfuzz import process, fuzz
+        except ImportError:
+            return None
+        m = process.extractOne(key, self._candidates(key), scorer=fuzz.ratio, score_cutoff=FUZZY_CUTOFF)
+        return self.names[m[0]] if m else None
+
+    def _candidates(self, key: str):
+        """Names that can score FUZZY_CUTOFF against key: similar length, and
+        enough shared trigrams (one insertion or deletion breaks at most three)."""
+        if self._grams is None:
+            self._grams = {}
+            for name in self.names:
+                for g in _grams(name):
+                    self._grams.setdefault(g, []).append(name)
+        kg = _grams(key)
+        shared = Counter(name for g in kg for name in self._grams.get(g, ()))
+        cut = FUZZY_CUTOFF / 100
+        out = []
+        for name, n in shared.items():
+            total = len(key) + len(name)
+            if 2 * min(len(key), len(name)) >= cut * total and n >= len(kg) - 3 * (1 - cut) * total:
+                out.append(name)
+        return out
+
+
+def load_ports(path: Path = PORTS_CSV) -> Gazetteer:
+    g = Gazetteer()
+    if not Path(path).exists():
+        return g
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            rec = {"name": row["name"], "locode": row.get("locode", ""), "country": row.get("country", "")}
+            g.add(row["name"], rec)
+            if rec["locode"]:
+                g.by_id[rec["locode"]] = rec
+            for alias in (row.get("aliases") or "").split("|"):
+                if alias.strip():
+                    g.add(alias.strip(), rec)
+    return g
+
+
+def load_vessels(path: Path = VESSELS_CSV) -> Gazetteer:
+    """Optional name,imo list; empty gazetteer when the file is absent."""
+    g = Gazetteer()
+    if not Path(path).exists():
+        return g
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            rec = {"name": row["name"], "imo": (row.get("imo") or "").strip()}
+            g.add(row["name"], rec)
+            if rec["imo"]:
+                g.by_id[rec["imo"]] = rec
+    return g
+
+
+_ports = _vessels = None
+
+def ports() -> Gazetteer:
+    global _ports
+    if _ports is None:
+        _ports = load_ports()
+    return _ports
+
+def vessels() -> Gazetteer:
+    global _vessels
+    if _vessels is None:
+        _vessels = load_vessels()
+    return _vessels
@@ -1,25 +1,58 @@
-import json, glob, re
+import contextlib, json, os, re, sys, time, argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 from pathlib import Path
-import dateparser
-import spacy
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common import metrics, profiling
+from common.docstore import open_store
+from common.manifest import Manifest, content_hash
+from extract.dates import find_date, date_ents
+from extract.gazetteer import ports, vessels
 
 # folders
 IN_DIR = "data/classified"
 NORM_DIR = "data/normalized"
 OUT_DIR = "data/extracted"
+MANIFEST = "data/manifests/extract.json"
+
+# bump when the extraction heuristics change so existing outputs are redone
+EXTRACT_VERSION = "3"
+
+# batching for nlp.pipe (n_process > 1 forks spaCy workers)
+BATCH_SIZE = int(os.environ.get("EXTRACT_BATCH", "32"))
+N_PROCESS = int(os.environ.get("EXTRACT_PROCS", "1"))
+
+# process-pool mode: worker processes, and docs handed to a worker per task
+WORKERS = int(os.environ.get("EXTRACT_WORKERS", "1"))
+CHUNK_SIZE = int(os.environ.get("EXTRACT_CHUNK", "64"))
+
+MODEL = "en_core_web_sm"
+
+# the heuristics only read doc.ents and token.pos_ (tagger + attribute_ruler)
+UNUSED_PIPES = ("parser", "lemmatizer")
 
-# load spaCy model once
-nlp = spacy.load("en_core_web_sm")
+NLP_SECONDS = metrics.histogram("extract_spacy_seconds", "spaCy pipeline time per doc")
+RULES_SECONDS = metrics.histogram("extract_rules_seconds", "entity heuristics time per doc")
+EXTRACTED = metrics.counter("extract_docs_total", "Docs run through entity extraction")
+
+_nlp = None
+
+def get_nlp():
+    """spaCy model, loaded on first use (once per process)."""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load(MODEL)
+        _nlp.select_pipes(disable=[p for p in UNUSED_PIPES if p in _nlp.pipe_names])
+    return _nlp
 
 # simple regex helpers
 RE_IMO = re.compile(r"\bIMO\s*([0-9]{7})\b", re.I)
 RE_VESSEL_HINT = re.compile(r"\b(MV|M\/V|MS|M\.S\.|SS|M\/T|MT)\s+[A-Z0-9\- ]{3,}\b")
 PORT_WORDS = {"port", "harbor", "harbour", "terminal", "anchorage", "bay"}
-
-
-def load_doc(norm_path):
-    with open(norm_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+PORT_CUE = rf"\b({'|'.join(sorted(PORT_WORDS))})\b"
+RE_PORT_CUE = re.compile(PORT_CUE, re.I)
 
 
 NON_VESSEL_TERMS = {"tug", "tugs", "pilot", "pilots", "harbor", "harbour", "port", "authority"}
@@ -36,13 +69,47 @@ def normalize_ship_candidate(name: str) -> str | None:
     return " ".join(name.split())
 
 
-def choose_date(text):
-    dt = dateparser.parse(text, settings={"PREFER_DATES_FROM": "past"})
-    return dt.date().isoformat() if dt else None
+@profiling.hot("choose_date", lambda a, kw, r: profiling.text_info(a[0], pop=False))
+def choose_date(text, ents=(), published_at=None):
+    # candidate spans only; relative dates resolve against published_at
+    return find_date(text, ents, published_at)
+
+
+def nlp_input(title, text):
+    return f"{title}\n{text[:3000]}"
 
 
-def extract_entities(title, text):
-    doc = nlp(f"{title}\n{text[:3000]}")
+def _entities(doc, title, text, published_at):
+    with RULES_SECONDS.time():
+        ents = entities_from_doc(doc, title, text, published_at)
+    EXTRACTED.inc()
+    return ents
+
+
+@profiling.hot("extract_entities", lambda a, kw, r: profiling.text_info(a[1]))
+def extract_entities(title, text, published_at=None):
+    with NLP_SECONDS.time():
+        doc = get_nlp()(nlp_input(title, text))
+    return _entities(doc, title, text, published_at)
+
+
+def extract_many(items, batch_size=BATCH_SIZE, n_process=N_PROCESS):
+    """Stream (title, text, published_at, context) through nlp.pipe; yields (entities, context)."""
+    stream = ((nlp_input(title, text), (title, text, pub, ctx)) for title, text, pub, ctx in items)
+    docs = get_nlp().pipe(stream, as_tuples=True, batch_size=batch_size, n_process=n_process)
+    while True:
+        # pipe() is lazy: the wait for the next doc is the spaCy time (batched, so spiky per doc)
+        t0 = time.perf_counter()
+        try:
+            doc, (title, text, pub, ctx) = next(docs)
+        except StopIteration:
+            return
+        NLP_SECONDS.observe(time.perf_counter() - t0)
+        yield _entities(doc, title, text, pub), ctx
+
+
+@profiling.hot("entities_from_doc", lambda a, kw, r: profiling.text_info(a[2]))
+def entities_from_doc(doc, title, text, published_at=None):
     vessel = imo = port = date_iso = None
 
     # 1) IMO
@@ -56,23 +123,45 @@ def extract_entities(title, text):
         if m := RE_PORT_NAME.search(text):
             port = m.group(0)
 
-    # fallback: GPE/LOC with port cue nearby
+    # 2b) known port names / aliases from the gazetteer, title first
+    if not port:
+        if rec := (ports().first(title) or ports().first(text)):
+            port = rec["name"]
+
+    # fallback: GPE/LOC entities — gazetteer near-match first, then port cue nearby
     if not port:
         gpes = [ent.text for ent in doc.ents if ent.label_ in ("GPE","LOC")]
         for g in gpes:
-            if re.search(rf"\b{re.escape(g)}\b.*\b({'|'.join(PORT_WORDS)})\b", text, re.I) or "port" in title.lower():
-                port = g
+            if rec := ports().lookup(g):
+                port = rec["name"]
                 break
+        if not port and gpes and "port" in title.lower():
+            port = gpes[0]
+        if not port:
+            # the entity must precede a cue on the same line, so only cue lines can match
+            cue_lines = [ln for ln in text.split("\n") if RE_PORT_CUE.search(ln)]
+            for g in gpes:
+                if any(re.search(rf"\b{re.escape(g)}\b.*{PORT_CUE}", ln, re.I) for ln in cue_lines):
+                    port = g
+                    break
         if not port and gpes:
             port = gpes[0]
 
     # 3) VESSEL:
-    # 3a) Prefix pattern (MV/MS/SS/MT ...)
+    # 3a) Gazetteer: registered name for the IMO, else a known name in the text
     v = None
-    if m := RE_VESSEL_HINT.search(text.upper()):
+    if len(vessels()):
+        rec = vessels().by_id.get(imo) if imo else None
+        rec = rec or vessels().first(title) or vessels().first(text)
+        if rec:
+            v = rec["name"]
+            imo = imo or rec["imo"] or None
+
+    # 3b) Prefix pattern (MV/MS/SS/MT ...)
+    if not v and (m := RE_VESSEL_HINT.search(text.upper())):
         v = m.group(0).title()
 
-    # 3b) If still none, use proper-noun runs but drop obvious non-vessels
+    # 3c) If still none, use proper-noun runs but drop obvious non-vessels
     if not v:
         proper_runs, current = [], []
         for t in doc:
@@ -93,45 +182,143 @@ def extract_entities(title, text):
     vessel = v
 
     # 4) DATE: prefer explicit in text; fallback to None (we’ll fill from published_at outside)
-    date_iso = choose_date(text) or choose_date(title)
+    # the Doc is "title\ntext[:3000]": split its DATE ents back into title / body offsets
+    off = len(title) + 1
+    date_iso = (choose_date(text, date_ents(doc, off), published_at)
+                or choose_date(title, date_ents(doc, 0, len(title)), published_at))
 
     return {"vessel": vessel, "imo": imo, "port": port, "date": date_iso}
-def run():
-    Path(OUT_DIR).mkdir(parents=True, exist_ok=True)
-    cls_files = glob.glob(f"{IN_DIR}/*.classify.json")
+
+
+def _init_worker():
+    get_nlp()
+
+
+def _extract_chunk(chunk, batch_size):
+    return [ents for ents, _ in extract_many(((t, x, p, None) for t, x, p in chunk), batch_size, 1)]
+
+
+def extract_parallel(items, workers=WORKERS, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE):
+    """Like extract_many, but chunks go to a process pool whose workers each
+    load the model once. Yields (entities, context) in completion order."""
+    items = iter(items)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        inflight = {}
+
+        def submit():
+            chunk = list(islice(items, chunk_size))
+            if chunk:
+                fut = ex.submit(_extract_chunk, [(t, x, p) for t, x, p, _ in chunk], batch_size)
+                inflight[fut] = [ctx for *_, ctx in chunk]
+            return bool(chunk)
+
+        # keep every worker busy with one chunk queued behind it
+        for _ in range(workers * 2):
+            if not submit():
+                break
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                ctxs = inflight.pop(fut)
+                yield from zip(fut.result(), ctxs)
+                submit()
+
+
+def manifest_version() -> str:
+    # the installed package's meta.json: the parent doesn't need the pipeline itself
+    # when the work runs in worker processes
+    if _nlp is not None:
+        meta = _nlp.meta
+    else:
+        from spacy.util import get_model_meta, get_package_path
+        meta = get_model_meta(get_package_path(MODEL))
+    return f"{EXTRACT_VERSION}:{meta.get('name')}-{meta.get('version')}"
+
+
+def doc_hash(cls, norm=None) -> str:
+    """Manifest content hash: the classification, plus the text for incidents."""
+    if norm is None:
+        return content_hash(json.dumps(cls, sort_keys=True))
+    return content_hash(json.dumps(cls, sort_keys=True), norm.get("title", ""),
+                        norm.get("content_text", ""), norm.get("published_at", ""))
+
+
+def make_output(norm, ents) -> dict:
+    return {
+        "doc_id": norm["doc_id"],
+        "vessel": ents["vessel"],
+        "imo": ents["imo"],
+        "port": ents["port"],
+        "date": ents["date"] or (norm.get("published_at", "")[:10] or None)
+    }
+
+
+def run(full=False, batch_size=BATCH_SIZE, n_process=N_PROCESS, workers=WORKERS, store=None):
+    """Extract entities for new or changed incident docs; full=True redoes all."""
+    if store is None:
+        store = open_store(dirs={"normalized": NORM_DIR, "classified": IN_DIR, "extracted": OUT_DIR})
+    manifest = Manifest(MANIFEST, manifest_version())
+    cls_stamps = store.stamps("classified")
+    norm_stamps = store.stamps("normalized")
+    stats = {"unchanged": 0}
+
+    def pending():
+        for key, cs in cls_stamps.items():
+            ns = norm_stamps.get(key)
+            if ns is None:
+                continue
+            if not full and manifest.unchanged(key, cs, ns):
+                stats["unchanged"] += 1
+                continue
+
+            cls = store.get("classified", key)
+            if cls is None:
+                continue
+            if not cls.get("is_incident"):
+                manifest.record(key, doc_hash(cls), cs, ns)
+                continue
+
+            norm = store.get("normalized", key)
+            if norm is None:
+                continue
+
+            chash = doc_hash(cls, norm)
+            if not full and manifest.current(key, chash):
+                manifest.record(key, chash, cs, ns)
+                stats["unchanged"] += 1
+                continue
+            text = norm.get("content_text", "")
+            profiling.name_text(text, key)  # no-op with --workers > 1: no naming() scope
+            yield norm.get("title", ""), text, norm.get("published_at"), (key, chash, cs, ns, norm)
+
     count = 0
-    for cf in cls_files:
-        with open(cf, "r", encoding="utf-8") as f:
-            cls = json.load(f)
-        if not cls.get("is_incident"):
-            continue
-
-        norm_path = Path(NORM_DIR) / Path(cf).name.replace(".classify.json", ".json")
-        if not norm_path.exists():
-            continue
-        norm = load_doc(norm_path)
-
-        title = norm.get("title", "")
-        text = norm.get("content_text", "")
-        ents = extract_entities(title, text)
-
-        date_final = ents["date"] or (norm.get("published_at", "")[:10] or None)
-        out = {
-            "doc_id": norm["doc_id"],
-            "vessel": ents["vessel"],
-            "imo": ents["imo"],
-            "port": ents["port"],
-            "date": date_final
-        }
-
-        out_path = Path(OUT_DIR) / f"{norm['doc_id']}.extract.json"
-        with open(out_path, "w", encoding="utf-8") as oh:
-            json.dump(out, oh, ensure_ascii=False, indent=2)
-        count += 1
-
-    print(f"Extracted entities for {count} incident docs → {OUT_DIR}")
+    if workers > 1:
+        # entities are built in the worker processes, which don't profile
+        results = extract_parallel(pending(), workers, batch_size)
+        names = contextlib.nullcontext()
+    else:
+        results = extract_many(pending(), batch_size, n_process)
+        names = profiling.naming()
+    with names:
+        for ents, (key, chash, cs, ns, norm) in results:
+            store.put("extracted", make_output(norm, ents))
+            manifest.record(key, chash, cs, ns)
+            count += 1
 
+    manifest.save()
+    print(f"Extracted entities for {count} incident docs → {type(store).__name__} | unchanged: {stats['unchanged']}")
 
-if __name__ == "__main__":
-    run()
 
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="re-extract every incident doc, ignoring the manifest")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="docs per nlp.pipe batch")
+    ap.add_argument("--n-process", type=int, default=N_PROCESS, help="spaCy worker processes")
+    ap.add_argument("--workers", type=int, default=WORKERS,
+                    help="process-pool workers, each loading the model once (1 = in-process)")
+    profiling.add_argument(ap)
+    a = ap.parse_args()
+    metrics.setup()
+    profiling.setup("extract", a.profile)
+    with profiling.stage("extract"):
+        run(full=a.full, batch_size=a.batch_size, n_process=a.n_process, workers=a.workers)
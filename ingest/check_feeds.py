@@ -1,22 +1,42 @@
-import csv, feedparser
+import csv, sys, feedparser
 from pathlib import Path
+from feed_cache import FeedCache
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common import http_client as http
 
 SOURCES = Path(__file__).parent / "sources.csv"
+# separate from ingest's cache: a check must never make ingest see a 304
+CACHE = Path(__file__).resolve().parents[1] / "data" / "feed_cache.check.json"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# --conditional: send ETag/Last-Modified from the previous check and skip unchanged feeds
+conditional = "--conditional" in sys.argv
+cache = FeedCache(CACHE) if conditional else None
 
 with open(SOURCES) as f:
     for row in csv.DictReader(f):
         if row["kind"] != "rss":
             continue
 
-        d = feedparser.parse(
-            row["url"],
-            request_headers={"User-Agent": "Mozilla/5.0"}
-        )
+        headers = cache.headers(row["url"], HEADERS) if cache else HEADERS
+        try:
+            r = http.get(row["url"], headers=headers, timeout=20)
+        except Exception as e:
+            print(f"{row['source_id']:<24} fetch failed: {e}")
+            continue
+        if r.status_code == 304:
+            print(f"{row['source_id']:<24} not modified (304)  url={row['url']}")
+            continue
+        if cache:
+            cache.stage(row["source_id"], row["url"], r)
+            cache.commit(row["source_id"])
+
+        d = feedparser.parse(r.content, response_headers=dict(r.headers))
 
         # Inspect results
         bozo = getattr(d, "bozo", 0)
         err = getattr(d, "bozo_exception", None)
-        print(f"{row['source_id']:<24} items={len(d.entries):>4}  bozo={bozo}  url={row['url']}")
+        print(f"{row['source_id']:<24} items={len(d.entries):>4}  bozo={bozo}  http={r.status_code}  url={row['url']}")
         if bozo and err:
             print(f"  ↳ parse warning: {err}")
-
@@ -0,0 +1,86 @@
+# per-source HTTP validator cache (ETag / Last-Modified) + newest entry seen,
+# plus entries whose article download failed and is due for another try
+
+import calendar, json, os
+from pathlib import Path
+
+
+class FeedCache:
+    """Remembers validators per URL and the newest entry timestamp per source.
+
+    Validators from a fresh response are only staged; call commit(source_id)
+    once the source's entries are safely processed, so a crash mid-source
+    can't turn the next poll into a 304 that hides unprocessed items.
+
+    Entries whose article download failed are kept under "retry" until a
+    download works or the attempts run out; the feed itself won't offer them
+    again once the validators or the newest timestamp have moved past them.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        state = {}
+        if self.path.exists():
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+        self.validators = state.get("validators", {})
+        self.newest = state.get("newest", {})
+        self.retry = state.get("retry", {})  # source_id → link → {"entry", "attempts"}
+        self._pending = {}
+
+    def headers(self, url: str, base: dict | None = None) -> dict:
+        h = dict(base or {})
+        v = self.validators.get(url, {})
+        if v.get("etag"):
+            h["If-None-Match"] = v["etag"]
+        if v.get("last_modified"):
+            h["If-Modified-Since"] = v["last_modified"]
+        return h
+
+    def stage(self, source_id: str, url: str, response):
+        v = {"etag": response.headers.get("ETag"),
+             "last_modified": response.headers.get("Last-Modified")}
+        if v["etag"] or v["last_modified"]:
+            self._pending.setdefault(source_id, {})[url] = v
+
+    def fresh_entries(self, source_id: str, entries):
+        """Drop dated entries no newer than the newest one already processed."""
+        cutoff = self.newest.get(source_id)
+        if cutoff is None:
+            return entries
+        return [e for e in entries if e.get("ts") is None or e["ts"] > cutoff]
+
+    def commit(self, source_id: str, entries=()):
+        self.validators.update(self._pending.pop(source_id, {}))
+        stamps = [e["ts"] for e in entries if e.get("ts") is not None]
+        if stamps:
+            self.newest[source_id] = max(stamps + [self.newest.get(source_id, 0)])
+        self.save()
+
+    def retry_entries(self, source_id: str) -> list:
+        return [r["entry"] for r in self.retry.get(source_id, {}).values()]
+
+    def fetch_failed(self, source_id: str, entry) -> int:
+        """Note a failed download; returns how many times it has failed so far."""
+        r = self.retry.setdefault(source_id, {}).setdefault(entry["link"], {"entry": entry, "attempts": 0})
+        r["attempts"] += 1
+        return r["attempts"]
+
+    def fetch_done(self, source_id: str, entry):
+        links = self.retry.get(source_id)
+        if links and links.pop(entry.get("link"), None) is not None and not links:
+            del self.retry[source_id]
+
+    def save(self):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({"validators": self.validators, "newest": self.newest, "retry": self.retry},
+                                  ensure_ascii=False, indent=2))
+        os.replace(tmp, self.path)
+
+
+def entry_ts(e):
+    """Feed entry update (else publish) time as epoch seconds (UTC), or None.
+
+    Update time comes first so an edited article counts as new again.
+    """
+    t = e.get("updated_parsed") or e.get("published_parsed")
+    return float(calendar.timegm(t)) if t else None
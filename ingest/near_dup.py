@@ -0,0 +1,89 @@
+# near-duplicate detection (64-bit SimHash + banded lookup) for syndicated copies
+
+import hashlib, json, os, re
+from pathlib import Path
+
+BITS = 64
+BANDS = 4                      # 4 x 16-bit bands
+BAND_BITS = BITS // BANDS
+MAX_DISTANCE = 3               # ≤ BANDS-1 bits apart → guaranteed to share a band
+MIN_TOKENS = 40                # summaries / stubs are too short to fingerprint reliably
+SHINGLE = 3
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def simhash(text: str) -> int | None:
+    tokens = _TOKEN.findall((text or "").lower())
+    if len(tokens) < MIN_TOKENS:
+        return None
+    weights = [0] * BITS
+    for i in range(len(tokens) - SHINGLE + 1):
+        sh = " ".join(tokens[i:i + SHINGLE]).encode("utf-8")
+        h = int.from_bytes(hashlib.blake2b(sh, digest_size=8).digest(), "big")
+        for b in range(BITS):
+            weights[b] += 1 if (h >> b) & 1 else -1
+    return sum(1 << b for b in range(BITS) if weights[b] > 0)
+
+
+def _bands(h: int):
+    mask = (1 << BAND_BITS) - 1
+    return [(i, (h >> (i * BAND_BITS)) & mask) for i in range(BANDS)]
+
+
+class NearDupIndex:
+    """doc_id → (simhash, canonical doc_id), with band buckets for sub-linear lookup.
+
+    Persisted as JSON; seeded from the normalized docs (an iterable, only
+    consumed when no index exists yet) the first time it is opened.
+    """
+
+    def __init__(self, path: Path, seed=None):
+        self.path = Path(path)
+        self.docs = {}     # doc_id -> [hex simhash, canonical_id]
+        self.buckets = {}  # (band, value) -> [doc_id, ...]
+        self._dirty = False
+        if self.path.exists():
+            for doc_id, (hx, canon) in json.loads(self.path.read_text(encoding="utf-8")).items():
+                self._index(doc_id, int(hx, 16), canon)
+        elif seed is not None:
+            for doc in seed:
+                self.add(doc["doc_id"], simhash(doc_text(doc)), doc.get("canonical_id"))
+            self.save()
+
+    def _index(self, doc_id, h, canon):
+        self.docs[doc_id] = [format(h, "016x"), canon]
+        for key in _bands(h):
+            self.buckets.setdefault(key, []).append(doc_id)
+
+    def find(self, h: int | None) -> str | None:
+        """Canonical doc_id of the closest indexed near-duplicate, if any."""
+        if h is None:
+            return None
+        best, best_d = None, MAX_DISTANCE + 1
+        for key in _bands(h):
+            for doc_id in self.buckets.get(key, ()):
+                d = bin(h ^ int(self.docs[doc_id][0], 16)).count("1")
+                if d < best_d:
+                    best, best_d = doc_id, d
+        return (self.docs[best][1] or best) if best else None
+
+    def add(self, doc_id: str, h: int | None, canonical_id: str | None = None):
+        if h is None or doc_id in self.docs:
+            return
+        self._index(doc_id, h, canonical_id or doc_id)
+        self._dirty = True
+
+    def save(self):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.docs))
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def flush(self):
+        if self._dirty:
+            self.save()
+
+
+def doc_text(doc) -> str:
+    return f"{doc.get('title','')}\n{doc.get('content_text','')}"
@@ -0,0 +1,76 @@
+# CPU side of ingest: downloaded HTML → normalized doc
+#
+# Pure functions of their arguments (no network, no shared state), so they can
+# run on a fetch thread or in a process pool (run_ingest --cpu-workers). Timings
+# come back with the result because a worker process's metrics would be lost.
+
+import time
+import trafilatura
+from dateutil import parser as dtp
+from langdetect import detect as lang_detect
+from utils import iso_now, make_doc_id, looks_maritime
+
+
+def html_to_text(html: str) -> str:
+    if not html:
+        return ""
+    try:
+        return (trafilatura.extract(html) or "").strip()
+    except Exception:
+        return ""
+
+
+def parse_item(item, html, source_id, reliability, default_lang):
+    """Returns (doc or None, stats); stats holds per-step seconds, for a
+    dropped item the skip reason, and fetch_failed when html is None (the
+    download failed, so the doc rests on the feed summary alone)."""
+    stats = {"fetch_failed": True} if html is None else {}
+    url = item.get("link") or item.get("id")
+    title = (item.get("title") or "").strip()
+    if not url or not title:
+        return None, stats
+
+    # full text
+    t0 = time.perf_counter()
+    text = html_to_text(html)
+    if html:
+        stats["trafilatura"] = time.perf_counter() - t0
+    if not text:
+        # fallback to feed summary
+        text = (item.get("summary") or "").strip()
+
+    # basic filters (skip if not maritime-ish)
+    if not looks_maritime(f"{title}\n{text}"):
+        stats["skip"] = "non_maritime"
+        return None, stats
+
+    # language guess
+    try:
+        if default_lang:
+            lang = default_lang
+        else:
+            t0 = time.perf_counter()
+            lang = lang_detect((title + " " + text)[:5000])
+            stats["langdetect"] = time.perf_counter() - t0
+    except Exception:
+        lang = default_lang or "en"
+
+    # published time
+    pub = item.get("published") or item.get("updated") or ""
+    try:
+        published_at = dtp.parse(pub).astimezone().astimezone(tz=None).astimezone().isoformat()
+    except Exception:
+        published_at = iso_now()
+
+    doc = {
+        "doc_id": make_doc_id(title, url, text),
+        "source_id": source_id,
+        "url": url,
+        "title": title,
+        "published_at": published_at,
+        "fetched_at": iso_now(),
+        "language": lang,
+        "reliability": float(reliability or 0.7),
+        "content_text": text
+    }
+    return doc, stats
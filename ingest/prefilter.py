@@ -0,0 +1,130 @@
+# pre-fetch relevance gate: score feed metadata before downloading the article
+#
+# Title, summary and categories are scored against utils.MARITIME_HINTS and the
+# mock classifier's incident keywords (distinct keywords; an incident word
+# counts double).
+# Entries below the threshold are not downloaded:
+#
+#   INGEST_PREFILTER=2              threshold (0 = gate off, the default)
+#   INGEST_PREFILTER_ACTION=skip    drop the entry | "summary": keep a doc built
+#                                   from the feed summary, without the download
+#   INGEST_PREFILTER_SAMPLE=0.05    share of gated entries fetched anyway to
+#                                   measure false negatives
+#
+# Only RSS sources are gated (HTML listings carry nothing but a link title).
+# A sampled entry is a false negative if its full text turns out maritime
+# and mentions an incident. Counts accumulate in data/prefilter.json:
+#
+#   python ingest/prefilter.py      per-source stats and false-negative rate
+
+import json, os, random, re, sys
+from pathlib import Path
+from utils import MARITIME_HINTS, looks_maritime
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from classify.providers.mock_provider import R_INCIDENT as INCIDENT_HINTS
+from common import metrics
+from common.atomic import write_json_atomic
+
+STATS = Path(__file__).resolve().parents[1] / "data" / "prefilter.json"
+THRESHOLD = float(os.environ.get("INGEST_PREFILTER", "0"))
+ACTION = os.environ.get("INGEST_PREFILTER_ACTION", "skip").lower()
+SAMPLE = float(os.environ.get("INGEST_PREFILTER_SAMPLE", "0.05"))
+
+DECISIONS = metrics.counter("ingest_prefilter_total", "Pre-fetch gate decisions (fetch/skip/summary/sample)")
+FALSE_NEG = metrics.counter("ingest_prefilter_false_negatives_total", "Sampled gated entries that were relevant")
+
+_TAG = re.compile(r"<[^>]+>")
+
+
+def score(entry) -> float:
+    text = " ".join([entry.get("title") or "", _TAG.sub(" ", entry.get("summary") or ""),
+                     *(entry.get("tags") or [])])
+    maritime = {m.lower() for m in MARITIME_HINTS.findall(text)}
+    incident = {m.lower() for m in INCIDENT_HINTS.findall(text)}
+    return len(maritime) + 2 * len(incident)
+
+
+def relevant(doc) -> bool:
+    """What the gate tries to predict: a maritime article that mentions an incident."""
+    if not doc:
+        return False
+    text = f"{doc.get('title', '')}\n{doc.get('content_text', '')}"
+    return looks_maritime(text) and bool(INCIDENT_HINTS.search(text))
+
+
+class Prefilter:
+    def __init__(self, threshold: float = THRESHOLD, action: str = ACTION, sample: float = SAMPLE,
+                 path: Path = STATS, seed=None):
+        if action not in ("skip", "summary"):
+            raise ValueError(f"INGEST_PREFILTER_ACTION must be skip or summary, not {action!r}")
+        self.threshold, self.action, self.sample = threshold, action, sample
+        self.path = Path(path)
+        self.stats = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        self.rnd = random.Random(seed)
+        self.run = {}  # this process only, for the end-of-run summary
+        self._dirty = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def gates(self, src) -> bool:
+        return self.enabled and src.get("kind") == "rss"
+
+    def decide(self, entry, src) -> str:
+        """fetch | skip | summary | sample (gated, but fetched to check the gate).
+        Not counted until record(): a timed-out poll leaves entries undone."""
+        if not self.gates(src):
+            return "fetch"
+        if score(entry) >= self.threshold:
+            return "fetch"
+        return "sample" if self.rnd.random() < self.sample else self.action
+
+    def record(self, src, decision: str):
+        """Count the decision for an entry that has been processed."""
+        if self.gates(src):
+            self._count(src["source_id"], decision)
+
+    def checked(self, src, doc):
+        """Outcome of a sampled entry."""
+        if relevant(doc):
+            FALSE_NEG.inc(source=src["source_id"])
+            self._count(src["source_id"], "false_negative")
+
+    def _count(self, sid, key):
+        if key != "false_negative":
+            DECISIONS.inc(decision=key)
+        for st in (self.stats.setdefault(sid, {}), self.run):
+            st[key] = st.get(key, 0) + 1
+        self._dirty = True
+
+    def flush(self):
+        if self._dirty:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.path, self.stats)
+            self._dirty = False
+
+    def totals(self) -> dict:
+        t = {}
+        for st in self.stats.values():
+            for k, v in st.items():
+                t[k] = t.get(k, 0) + v
+        return t
+
+
+def describe(st: dict) -> str:
+    avoided = st.get("skip", 0) + st.get("summary", 0)
+    seen = avoided + st.get("sample", 0) + st.get("fetch", 0)
+    fn, sampled = st.get("false_negative", 0), st.get("sample", 0)
+    out = f"avoided {avoided}/{seen} downloads ({avoided / seen:.0%})" if seen else "no entries"
+    if sampled:
+        out += f" | sampled {sampled}: {fn} false negatives ({fn / sampled:.1%}, ~{fn / sampled * avoided:.0f} missed)"
+    return out
+
+
+if __name__ == "__main__":
+    pf = Prefilter()
+    for sid, st in sorted(pf.stats.items()):
+        print(f"{sid:<24} {describe(st)}")
+    print(f"{'TOTAL':<24} {describe(pf.totals())}")
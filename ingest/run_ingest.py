@@ -1,11 +1,22 @@
-import csv, json, os, time
+import csv, os, sys, time, threading, argparse
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse
 from pathlib import Path
-import feedparser, requests, trafilatura
-from dateutil import parser as dtp
-from langdetect import detect as lang_detect
-from utils import iso_now, make_doc_id, looks_maritime
+import feedparser
+from normalize import parse_item
+from seen_index import SeenIndex
+from feed_cache import FeedCache, entry_ts
+from near_dup import NearDupIndex, simhash, doc_text
+from prefilter import Prefilter, describe as prefilter_describe
 from bs4 import BeautifulSoup
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common import http_client as http
+from common.docstore import open_store
+from common.catalog import Catalog
+from common import metrics, profiling
+
 
 
 ROOT = Path(__file__).resolve().parents[1]
@@ -13,92 +24,140 @@ DATA = ROOT / "data"
 RAW = DATA / "raw"
 NORM = DATA / "normalized"
 CATALOG = DATA / "catalog.jsonl"
+SEEN_INDEX = DATA / "seen_urls.json"
+FEED_CACHE = DATA / "feed_cache.json"
+NEAR_DUP_INDEX = DATA / "near_dup.json"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
 for p in (RAW, NORM): p.mkdir(parents=True, exist_ok=True)
 
+# concurrency: total fetch workers, and max in-flight requests per host
+WORKERS = int(os.environ.get("INGEST_WORKERS", "8"))
+PER_HOST = int(os.environ.get("INGEST_PER_HOST", "2"))
+POLITE_DELAY = 0.2  # seconds a host slot stays busy after each fetch
+# sources polled at once by ingest_once(): one feed's articles mostly share a
+# host, so a single source keeps only PER_HOST of the fetch workers busy. They
+# download together but write in sources.csv order, so the output matches a
+# serial run.
+SOURCES = int(os.environ.get("INGEST_SOURCES", "4"))
+
+# CPU side (trafilatura, langdetect, doc ids) in worker processes (0 = on the fetch
+# threads), and how many downloaded pages may wait for a free parser
+CPU_WORKERS = int(os.environ.get("INGEST_CPU_WORKERS", "0"))
+CPU_QUEUE = int(os.environ.get("INGEST_CPU_QUEUE", "0")) or None  # default 4 per worker
+
+# known URLs younger than this are fetched again in case the article was edited (0 = never)
+REFETCH_HOURS = float(os.environ.get("INGEST_REFETCH_HOURS", "0"))
+
+# near-duplicates (syndicated copies): "link" to the canonical doc, "drop" them, or "off"
+NEAR_DUP = os.environ.get("INGEST_NEAR_DUP", "link").lower()
+
+FETCHED = metrics.counter("ingest_articles_fetched_total", "Article pages fetched (ok or not)")
+SKIPPED = metrics.counter("ingest_skipped_total", "Entries not written, by reason")
+WRITTEN = metrics.counter("ingest_docs_written_total", "New normalized docs, by source")
+NEAR_DUPES = metrics.counter("ingest_near_duplicates_total", "Near-duplicates found, by action (link/drop)")
+FETCH_FAILED = metrics.counter("ingest_fetch_failed_total", "Article downloads that failed (retried later)")
+SOURCE_ERRORS = metrics.counter("ingest_source_errors_total", "Feed fetch failures, by source")
+FEED_NOT_MODIFIED = metrics.counter("ingest_feed_not_modified_total", "Feed/listing polls answered 304")
+TRAFILATURA_SECONDS = metrics.histogram("ingest_trafilatura_seconds", "trafilatura.extract per article")
+LANGDETECT_SECONDS = metrics.histogram("ingest_langdetect_seconds", "langdetect per article")
+SOURCE_SECONDS = metrics.histogram("ingest_source_seconds", "One poll of one source, end to end")
+SOURCES_INFLIGHT = metrics.gauge("ingest_sources_inflight", "Sources being polled right now")
+
+_host_lock = threading.Lock()
+_host_slots = {}
+
+def host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _host_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(PER_HOST)
+        return _host_slots[host]
+
 def read_sources():
     with open(Path(__file__).parent / "sources.csv") as f:
         for row in csv.DictReader(f):
             yield row
 
-def clean_html_to_text(url: str) -> str:
-    try:
-        r = requests.get(url, timeout=15)
-        r.raise_for_status()
-        text = trafilatura.extract(r.text) or ""
-        return text.strip()
-    except Exception:
-        return ""
+# failed article downloads are retried on the next polls before falling back to the summary
+FETCH_ATTEMPTS = int(os.environ.get("INGEST_FETCH_ATTEMPTS", "3"))
+
+def fetch_html(url: str) -> str | None:
+    """Page HTML, or None if the download failed (timeout, HTTP error, size cap)."""
+    with host_slot(url):
+        try:
+            FETCHED.inc()
+            r = http.get(url, timeout=15)
+            r.raise_for_status()
+            return r.text
+        except Exception:
+            return None
+        finally:
+            time.sleep(POLITE_DELAY)  # polite
 
-def save_json(obj, path: Path):
-    path.write_text(json.dumps(obj, ensure_ascii=False, indent=2))
+def already_seen(store, doc_id: str) -> bool:
+    # cheap check: file exists / primary-key lookup
+    return store.exists("normalized", doc_id)
 
-def append_catalog(line_obj):
-    with open(CATALOG, "a", encoding="utf-8") as f:
-        f.write(json.dumps(line_obj, ensure_ascii=False) + "\n")
+def _describe_norm(args, kwargs, result):
+    (item, source_id), (doc, _) = args[:2], result
+    return {"doc_id": doc["doc_id"] if doc else None, "source": source_id,
+            "url": item.get("link") or item.get("id"), "text_len": len(doc["content_text"]) if doc else None}
 
-def already_seen(doc_id: str) -> bool:
-    # cheap check: look for existing file
-    return (NORM / f"{doc_id}.json").exists()
+def _account(result):
+    """(doc, fetched) from parse_item()'s result, which may come from a worker
+    process; records its metrics here."""
+    doc, stats = result
+    if "trafilatura" in stats:
+        TRAFILATURA_SECONDS.observe(stats["trafilatura"])
+    if "langdetect" in stats:
+        LANGDETECT_SECONDS.observe(stats["langdetect"])
+    if stats.get("skip"):
+        SKIPPED.inc(reason=stats["skip"])
+    if stats.get("fetch_failed"):
+        FETCH_FAILED.inc()
+    return doc, not stats.get("fetch_failed")
 
+@profiling.hot("norm_item", _describe_norm)
 def norm_item(item, source_id, reliability, default_lang):
     url = item.get("link") or item.get("id")
-    title = (item.get("title") or "").strip()
-    if not url or not title:
-        return None
+    html = fetch_html(url) if url and (item.get("title") or "").strip() else ""
+    return _account(parse_item(item, html, source_id, reliability, default_lang))
 
-    # full text
-    text = clean_html_to_text(url)
-    if not text:
-        # fallback to feed summary
-        text = (item.get("summary") or "").strip()
+def summary_item(item, source_id, reliability, default_lang):
+    """Doc from the feed's own title/summary, without downloading the article."""
+    return _account(parse_item(item, "", source_id, reliability, default_lang))
 
-    # basic filters (skip if not maritime-ish)
-    if not looks_maritime(f"{title}\n{text}"):
-        return None
 
-    # language guess
-    try:
-        lang = default_lang or lang_detect((title + " " + text)[:5000])
-    except Exception:
-        lang = default_lang or "en"
+def list_page_links(base_url: str, item_selector: str, link_selector: str, max_pages: int = 1,
+                    cache: FeedCache | None = None, source_id: str = ""):
+    """Scrape (href, title) pairs from a listing page.
 
-    # published time
-    pub = item.get("published") or item.get("updated") or ""
-    try:
-        published_at = dtp.parse(pub).astimezone().astimezone(tz=None).astimezone().isoformat()
-    except Exception:
-        published_at = iso_now()
-
-    doc_id = make_doc_id(title, url, text)
-    doc = {
-        "doc_id": doc_id,
-        "source_id": source_id,
-        "url": url,
-        "title": title,
-        "published_at": published_at,
-        "fetched_at": iso_now(),
-        "language": lang,
-        "reliability": float(reliability or 0.7),
-        "content_text": text
-    }
-    return doc
-
-
-def list_page_links(base_url: str, item_selector: str, link_selector: str, max_pages: int = 1):
-    headers = {"User-Agent": "Mozilla/5.0"}
-    links = []
+    Returns None when the first page answers 304 Not Modified; raises if no
+    page could be fetched.
+    """
+    links, ok, error = [], False, None
     for p in range(1, max_pages + 1):
         url = base_url if p == 1 else (base_url.rstrip("/") + f"/page/{p}/")
+        # only page 1 is conditional: if it hasn't changed, neither has the listing
+        headers = cache.headers(url, HEADERS) if (cache and p == 1) else HEADERS
         try:
-            r = requests.get(url, headers=headers, timeout=20)
+            r = http.get(url, headers=headers, timeout=20)
+            if r.status_code == 304:
+                return None
             r.raise_for_status()
-        except Exception:
+        except Exception as e:
+            error = e
             continue
+        ok = True
+        if cache and p == 1:
+            cache.stage(source_id, url, r)
         soup = BeautifulSoup(r.text, "html.parser")
         for card in soup.select(item_selector):
             a = card.select_one(link_selector)
             if a and a.get("href"):
                 links.append((a.get("href"), a.get_text(strip=True)))
+    if not ok and error is not None:
+        raise error
     # de-dup, preserve order
     seen=set(); out=[]
     for href,title in links:
@@ -106,43 +165,319 @@ def list_page_links(base_url: str, item_selector: str, link_selector: str, max_p
         seen.add(href); out.append((href,title))
     return out
 
-def ingest_once():
-    new_count, dupes = 0, 0
-    for src in read_sources():
-        kind = src["kind"]
-        if kind == "rss":
-            feed = feedparser.parse(
-                src["url"],
-                request_headers={"User-Agent": "Mozilla/5.0"}
-            )
-            print(f"→ {src['source_id']} fetched {len(feed.entries)} entries (bozo={getattr(feed,'bozo',0)})")
-            entries = [{"link": e.get("link") or e.get("id"),
-                        "title": e.get("title",""),
-                        "summary": e.get("summary","")} for e in feed.entries[:200]]
-        elif kind == "html":
-            item_sel = src.get("item_selector") or "article"
-            link_sel = src.get("link_selector") or "a"
-            max_pages = int(src.get("max_pages") or 1)
-            pairs = list_page_links(src["url"], item_sel, link_sel, max_pages)
-            print(f"→ {src['source_id']} scraped {len(pairs)} links from HTML")
-            entries = [{"link": href, "title": title, "summary": ""} for href,title in pairs]
-        else:
-            continue
+def read_feed(url: str, cache: FeedCache | None = None, source_id: str = ""):
+    """Conditional GET of an RSS/Atom feed. Returns None on 304 Not Modified."""
+    headers = cache.headers(url, HEADERS) if cache else HEADERS
+    r = http.get(url, headers=headers, timeout=20)
+    if r.status_code == 304:
+        return None
+    r.raise_for_status()
+    if cache:
+        cache.stage(source_id, url, r)
+    return feedparser.parse(r.content, response_headers=dict(r.headers))
+
+def read_entries(src, cache: FeedCache | None = None):
+    """Fresh entries of one source ([] on 304, None for an unknown kind).
+    Raises if the feed or listing can't be fetched."""
+    kind, sid = src["kind"], src["source_id"]
+    if kind == "rss":
+        feed = read_feed(src["url"], cache, sid)
+        if feed is None:
+            FEED_NOT_MODIFIED.inc(source=sid)
+            print(f"→ {sid} not modified (304)")
+            return []
+        print(f"→ {sid} fetched {len(feed.entries)} entries (bozo={getattr(feed,'bozo',0)})")
+        entries = [{"link": e.get("link") or e.get("id"),
+                    "guid": e.get("id"),
+                    "title": e.get("title",""),
+                    "summary": e.get("summary",""),
+                    "tags": [t.get("term") for t in e.get("tags", []) if t.get("term")],
+                    "published": e.get("published") or e.get("updated") or "",
+                    "ts": entry_ts(e)} for e in feed.entries[:200]]
+        return cache.fresh_entries(sid, entries) if cache else entries
+    if kind == "html":
+        item_sel = src.get("item_selector") or "article"
+        link_sel = src.get("link_selector") or "a"
+        max_pages = int(src.get("max_pages") or 1)
+        pairs = list_page_links(src["url"], item_sel, link_sel, max_pages, cache, sid)
+        if pairs is None:
+            FEED_NOT_MODIFIED.inc(source=sid)
+            print(f"→ {sid} not modified (304)")
+            return []
+        print(f"→ {sid} scraped {len(pairs)} links from HTML")
+        return [{"link": href, "title": title, "summary": ""} for href,title in pairs]
+    return None
+
+def norm_entries(entries, src, pool=None, cpu=None):
+    """Normalize feed entries, in parallel when a pool is given.
+
+    Results come back in entry order, so whatever consumes them sees exactly
+    the sequence a serial run would produce. With a CpuPool, the fetch threads
+    only download and the parsing happens in its worker processes.
+    """
+    args = (src["source_id"], src["reliability"], src["lang"])
+    if pool is None:
+        return (norm_item(e, *args) for e in entries)
+    if cpu is not None:
+        return _fetch_then_parse(entries, args, pool, cpu)
+    return pool.map(lambda e: norm_item(e, *args), entries)
+
+class CpuPool:
+    """Worker processes for parse_item(), fed through a bounded hand-off.
 
-        for entry in entries:
-            doc = norm_item(entry, src["source_id"], src["reliability"], src["lang"])
-            if not doc: continue
-            if already_seen(doc["doc_id"]):
-                dupes += 1; continue
-            save_json(doc, NORM / f"{doc['doc_id']}.json")
-            append_catalog({
-                "doc_id": doc["doc_id"], "url": doc["url"],
-                "source_id": doc["source_id"], "title": doc["title"],
-                "published_at": doc["published_at"]
-            })
-            new_count += 1
-            time.sleep(0.2)  # polite
-    print(f" new: {new_count} | dupes skipped: {dupes}")
+    A fetch thread holding a downloaded page waits for a slot before
+    submitting it, so at most `queue` pages sit in memory unparsed; the other
+    fetch threads keep downloading meanwhile.
+    """
+
+    def __init__(self, workers: int, queue: int | None = None):
+        # spawn: forking a process that runs fetch threads can copy held locks
+        self.ex = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        self.slots = threading.BoundedSemaphore(queue or 4 * workers)
+
+    def submit(self, item, html, args):
+        self.slots.acquire()
+        try:
+            fut = self.ex.submit(parse_item, item, html, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        fut.add_done_callback(lambda f: self.slots.release())
+        return fut
+
+    def close(self):
+        self.ex.shutdown(cancel_futures=True)
+
+def _fetch_for_cpu(item, args, cpu: CpuPool):
+    url = item.get("link") or item.get("id")
+    html = fetch_html(url) if url and (item.get("title") or "").strip() else ""
+    return cpu.submit(item, html, args)
+
+def _fetch_then_parse(entries, args, pool, cpu):
+    fetched = pool.map(lambda e: _fetch_for_cpu(e, args, cpu), entries)
+    try:
+        for fut in fetched:
+            yield _account(fut.result())
+    finally:
+        fetched.close()  # cancels the downloads not started yet
+
+class Ingestor:
+    """Shared state for ingesting sources (seen index, feed cache, doc store,
+    catalog, near-dup index, fetch pool).
+
+    ingest_source() may run for several sources at once (ingest_sources(),
+    scheduler.py): fetching happens in parallel, index/store writes are
+    serialized, and each source's docs are written in its entry order.
+    on_doc(doc) is called for every doc written (the streaming pipeline hands
+    them to classification from there). A store passed in is the caller's to
+    close; otherwise one is opened on NORM.
+    """
+
+    def __init__(self, workers: int = WORKERS, refetch_hours: float = REFETCH_HOURS,
+                 near_dup: str = NEAR_DUP, on_doc=None, cpu_workers: int = CPU_WORKERS,
+                 prefilter: Prefilter | None = None, store=None):
+        self.refetch_hours, self.near_dup, self.on_doc = refetch_hours, near_dup, on_doc
+        self.new_count, self.dupes, self.known, self.near = 0, 0, 0, 0
+        self.seen = SeenIndex(SEEN_INDEX, catalog=CATALOG)
+        self.cache = FeedCache(FEED_CACHE)
+        self.store = store or open_store(dirs={"normalized": NORM})
+        self._own_store = store is None
+        self.catalog = Catalog(CATALOG)
+        self.prefilter = prefilter or Prefilter()
+        self.ndx = NearDupIndex(NEAR_DUP_INDEX, seed=self.store.iter("normalized")) if near_dup != "off" else None
+        self.pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+        # parsing moves to processes only alongside fetch threads (serial stays serial)
+        self.cpu = CpuPool(cpu_workers, CPU_QUEUE) if cpu_workers > 0 and self.pool else None
+        self._lock = threading.Lock()
+
+    def ingest_source(self, src, deadline: float | None = None, turn=None) -> dict:
+        """Poll one source. Past the deadline (time.monotonic()) the remaining
+        entries are left unmarked and the validators uncommitted, so the next
+        poll picks them up again.
+
+        turn is a (wait, done) pair of events: downloads start right away, but
+        writing waits for `wait`, and `done` is set once this source is written.
+        """
+        try:
+            with SOURCES_INFLIGHT.track(), SOURCE_SECONDS.time(source=src["source_id"]), \
+                    profiling.stage(f"ingest:{src['source_id']}"):
+                return self._ingest_source(src, deadline, turn)
+        finally:
+            if turn is not None:
+                turn[0].wait()  # even a source with nothing to write keeps the chain
+                turn[1].set()
+
+    def ingest_sources(self, sources, concurrency: int = SOURCES):
+        """Poll sources, `concurrency` at a time, all sharing the fetch pool.
+        Sources are written one after another in the given order, so the
+        catalog and near-dup canonicals come out as in a serial run."""
+        if concurrency <= 1:
+            for src in sources:
+                self.ingest_source(src)
+            return
+        prev = threading.Event()
+        prev.set()
+        futs = []
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            for src in sources:  # FIFO: a source only waits on ones already started
+                done = threading.Event()
+                futs.append(ex.submit(self.ingest_source, src, None, (prev, done)))
+                prev = done
+            for fut in futs:
+                fut.result()
+
+    def _ingest_source(self, src, deadline, turn=None):
+        stats = {"entries": 0, "new": 0, "timed_out": False, "error": False}
+        try:
+            entries = read_entries(src, self.cache)
+        except Exception as e:
+            SOURCE_ERRORS.inc(source=src["source_id"])
+            print(f"→ {src['source_id']} fetch failed: {e}")
+            stats["error"] = True
+            entries = []  # retries of failed downloads still go ahead
+        if entries is None:
+            return stats
+        stats["entries"] = len(entries)
+        # skip known URLs/GUIDs before any network call; failed downloads go first
+        with self._lock:
+            links = {e["link"] for e in entries}
+            retry = [e for e in self.cache.retry_entries(src["source_id"]) if e["link"] not in links]
+            todo = retry + [e for e in entries if not self.seen.seen(e, self.refetch_hours)]
+            self.known += len(entries) + len(retry) - len(todo)
+            # relevance gate on the feed metadata: fetch / skip / summary / sample
+            plan = [self.prefilter.decide(e, src) for e in todo]
+        SKIPPED.inc(len(entries) + len(retry) - len(todo), reason="known_url")
+        docs = norm_entries([e for e, d in zip(todo, plan) if d in ("fetch", "sample")], src, self.pool, self.cpu)
+        if turn is not None:
+            turn[0].wait()  # sources before this one are fully written
+        # writes stay on this thread and in entry order → same output as serial
+        for entry, decision in zip(todo, plan):
+            if deadline is not None and time.monotonic() > deadline:
+                stats["timed_out"] = True
+                docs.close()  # cancels the fetches not started yet
+                break
+            if decision in ("fetch", "sample"):
+                doc, fetched = next(docs)
+            elif decision == "summary":
+                doc, fetched = summary_item(entry, src["source_id"], src["reliability"], src["lang"])
+            else:
+                doc, fetched = None, True  # skipped: only remembered as seen
+            with self._lock:
+                if turn is not None and entry not in retry and self.seen.seen(entry, self.refetch_hours):
+                    # written by an earlier source of this pass: a serial run wouldn't have fetched it
+                    self.known += 1
+                    SKIPPED.inc(reason="known_url")
+                    continue
+                # a failed download stays unmarked and is retried on the next
+                # polls; after FETCH_ATTEMPTS the summary-only doc is kept
+                if not fetched and self.cache.fetch_failed(src["source_id"], entry) < FETCH_ATTEMPTS:
+                    stats["retry"] = stats.get("retry", 0) + 1
+                    continue
+                self.cache.fetch_done(src["source_id"], entry)
+                self.prefilter.record(src, decision)
+                if decision == "skip":
+                    SKIPPED.inc(reason="prefilter")
+                elif decision == "sample":
+                    self.prefilter.checked(src, doc)
+                if self._write(entry, doc):
+                    stats["new"] += 1
+        with self._lock:
+            self.catalog.flush()  # one locked append per source
+            self.seen.flush()
+            self.prefilter.flush()
+            if self.ndx is not None:
+                self.ndx.flush()
+            if not stats["timed_out"]:
+                self.cache.commit(src["source_id"], entries)
+            else:
+                self.cache.save()  # keeps the retry list; validators stay uncommitted
+        return stats
+
+    def _write(self, entry, doc) -> bool:
+        if entry.get("link"):
+            self.seen.add(entry)  # also remembers off-topic pages so they aren't re-fetched
+        if not doc:
+            return False
+        if already_seen(self.store, doc["doc_id"]):
+            self.dupes += 1
+            SKIPPED.inc(reason="duplicate")
+            return False
+        if self.ndx is not None:
+            h = simhash(doc_text(doc))
+            canon = self.ndx.find(h)
+            if canon:
+                self.near += 1
+                NEAR_DUPES.inc(action=self.near_dup)
+                if self.near_dup == "drop":
+                    SKIPPED.inc(reason="near_duplicate")
+                    return False
+                doc["canonical_id"] = canon  # later stages run once per story
+            self.ndx.add(doc["doc_id"], h, canon)
+        self.store.put("normalized", doc)
+        line = {
+            "doc_id": doc["doc_id"], "url": doc["url"],
+            "source_id": doc["source_id"], "title": doc["title"],
+            "published_at": doc["published_at"]
+        }
+        if doc.get("canonical_id"):
+            line["canonical_id"] = doc["canonical_id"]
+        self.catalog.append(line)
+        self.new_count += 1
+        WRITTEN.inc(source=doc["source_id"])
+        if self.on_doc is not None:
+            self.on_doc(doc)
+        return True
+
+    def summary(self) -> str:
+        out = (f" new: {self.new_count} | dupes skipped: {self.dupes} | "
+               f"near-dupes ({self.near_dup}): {self.near} | known urls skipped: {self.known}")
+        if self.prefilter.enabled:
+            out += f"\n prefilter ({self.prefilter.action} < {self.prefilter.threshold:g}): " \
+                   f"{prefilter_describe(self.prefilter.run)}"
+        return out
+
+    def close(self):
+        self.catalog.close()
+        self.seen.flush()
+        if self._own_store:
+            self.store.close()
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        if self.cpu is not None:
+            self.cpu.close()
+
+def ingest_once(workers: int = WORKERS, refetch_hours: float = REFETCH_HOURS,
+                near_dup: str = NEAR_DUP, on_doc=None, cpu_workers: int = CPU_WORKERS,
+                prefilter: Prefilter | None = None, sources: int = SOURCES, store=None):
+    """One pass over sources.csv, `sources` feeds at a time (started in file order)."""
+    ing = Ingestor(workers, refetch_hours, near_dup, on_doc, cpu_workers, prefilter, store)
+    try:
+        ing.ingest_sources(read_sources(), sources)
+    finally:
+        ing.close()
+    print(ing.summary())
 
 if __name__ == "__main__":
-    ingest_once()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=WORKERS,
+                    help="parallel article fetches (1 = serial)")
+    ap.add_argument("--per-host", type=int, default=PER_HOST,
+                    help="max concurrent requests to one host")
+    ap.add_argument("--sources", type=int, default=SOURCES,
+                    help="sources polled at once (1 = one after another)")
+    ap.add_argument("--refetch-hours", type=float, default=REFETCH_HOURS,
+                    help="re-fetch known URLs first seen within this many hours")
+    ap.add_argument("--cpu-workers", type=int, default=CPU_WORKERS,
+                    help="processes for HTML extraction / language detection (0 = on the fetch threads)")
+    ap.add_argument("--prefilter", type=float, default=None, metavar="SCORE",
+                    help="skip downloads whose feed title/summary/tags score below this (0 = off)")
+    ap.add_argument("--near-dup", choices=("link", "drop", "off"), default=NEAR_DUP,
+                    help="what to do with near-duplicate articles")
+    profiling.add_argument(ap)
+    a = ap.parse_args()
+    PER_HOST = a.per_host
+    metrics.setup()
+    profiling.setup("ingest", a.profile)
+    ingest_once(workers=a.workers, refetch_hours=a.refetch_hours, near_dup=a.near_dup,
+                cpu_workers=a.cpu_workers, sources=a.sources,
+                prefilter=Prefilter(a.prefilter) if a.prefilter is not None else None)
@@ -0,0 +1,158 @@
+# long-running ingest: polls each source on its own adaptive interval
+#
+#   python ingest/scheduler.py [--concurrency 4] [--min 120] [--max 21600] [--timeout 300]
+#
+# Each source keeps an EWMA of its new docs per hour, and its interval (between
+# SCHED_MIN and SCHED_MAX seconds) is the time it takes to publish
+# SCHED_TARGET_NEW of them. One quiet poll after a burst only nudges the rate,
+# so the history isn't thrown away. A poll that runs out of time with entries
+# left halves the interval; a feed that can't be fetched, or one that has
+# never produced anything, backs off by SCHED_BACKOFF. Busy feeds settle near
+# the minimum, and publishers that post twice a week drift out to the maximum.
+# Sources run concurrently (a slow HTML scrape no longer holds up the RSS feeds), and
+# per-host politeness still comes from run_ingest.host_slot. State is saved to
+# data/scheduler.json after every poll, so a restart resumes the same
+# schedule.
+
+import argparse, json, os, random, sys, time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+import run_ingest
+from run_ingest import Ingestor, read_sources, DATA, WORKERS, CPU_WORKERS
+from utils import iso_now
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common import metrics
+from common.atomic import write_json_atomic
+
+STATE = DATA / "scheduler.json"
+MIN_INTERVAL = float(os.environ.get("SCHED_MIN", "120"))
+MAX_INTERVAL = float(os.environ.get("SCHED_MAX", str(6 * 3600)))
+BACKOFF = float(os.environ.get("SCHED_BACKOFF", "1.5"))
+TIMEOUT = float(os.environ.get("SCHED_TIMEOUT", "300"))      # per poll of one source
+CONCURRENCY = int(os.environ.get("SCHED_CONCURRENCY", "4"))  # sources polled at once
+TARGET_NEW = float(os.environ.get("SCHED_TARGET_NEW", "1"))   # new docs wanted per poll
+RATE_ALPHA = 0.3  # EWMA weight of the latest poll in the new-docs/hour estimate
+
+INTERVAL = metrics.gauge("sched_poll_interval_seconds", "Current poll interval, by source")
+POLLS = metrics.counter("sched_polls_total", "Source polls, by outcome (new/backlog/quiet/error)")
+
+
+class Scheduler:
+    def __init__(self, ingestor: Ingestor, state_path: Path = STATE, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, timeout=TIMEOUT, concurrency=CONCURRENCY):
+        self.ing = ingestor
+        self.path = Path(state_path)
+        self.min, self.max, self.timeout = min_interval, max_interval, timeout
+        self.concurrency = concurrency
+        self.state = {}
+        if self.path.exists():
+            self.state = json.loads(self.path.read_text(encoding="utf-8"))
+
+    def source_state(self, sid: str) -> dict:
+        # new sources start at the minimum interval and are due right away
+        st = self.state.setdefault(sid, {"interval": self.min, "next_due": 0.0, "last_poll": None,
+                                         "last_change": None, "polls": 0, "changes": 0, "errors": 0})
+        st.setdefault("rate_per_hour", 0.0)
+        st.setdefault("last_poll_ts", None)  # last poll that reached the feed
+        return st
+
+    def update(self, sid: str, new: int, error: bool = False, timed_out: bool = False):
+        st = self.source_state(sid)
+        now = time.time()
+        if not error:
+            # a failed poll measures nothing; the next good one covers its span too
+            if st["last_poll_ts"]:
+                rate = new * 3600 / max(now - st["last_poll_ts"], 1.0)
+                st["rate_per_hour"] = round(RATE_ALPHA * rate + (1 - RATE_ALPHA) * st["rate_per_hour"], 4)
+            st["last_poll_ts"] = now
+        st["polls"] += 1
+        st["last_poll"] = iso_now()
+        if error:
+            st["errors"] += 1
+        if new:
+            st["changes"] += 1
+            st["last_change"] = st["last_poll"]
+        if timed_out:
+            interval = st["interval"] / 2  # entries left behind: come back soon for the rest
+        elif error or not st["rate_per_hour"]:
+            interval = st["interval"] * BACKOFF
+        else:
+            interval = 3600 * TARGET_NEW / st["rate_per_hour"]
+        st["interval"] = min(self.max, max(self.min, interval))
+        # ±10% jitter keeps sources from falling into lock-step
+        st["next_due"] = now + st["interval"] * random.uniform(0.9, 1.1)
+        INTERVAL.set(st["interval"], source=sid)
+        POLLS.inc(outcome="error" if error else "new" if new else "backlog" if timed_out else "quiet")
+        write_json_atomic(self.path, self.state)
+
+    def _poll(self, src):
+        t0 = time.monotonic()
+        try:
+            return self.ing.ingest_source(src, deadline=t0 + self.timeout)
+        except Exception as e:
+            print(f"→ {src['source_id']} poll failed: {e}")
+            return {"new": 0, "timed_out": False, "error": True}
+
+    def _finish(self, inflight, done):
+        for fut in done:
+            sid = inflight.pop(fut)
+            stats = fut.result()
+            self.update(sid, stats["new"], stats["error"], stats["timed_out"])
+            st = self.state[sid]
+            print(f"[sched] {sid}: +{stats['new']}{' (timed out)' if stats['timed_out'] else ''}"
+                  f"{' (error)' if stats['error'] else ''} | next in {st['interval'] / 60:.1f} min"
+                  f" | ~{st['rate_per_hour']:.2f} new/h")
+
+    def run(self, stop_after: float | None = None):
+        """Poll due sources until interrupted (or for stop_after seconds)."""
+        sources = {s["source_id"]: s for s in read_sources()}
+        inflight = {}
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as ex:
+            while stop_after is None or time.time() - started < stop_after:
+                now = time.time()
+                busy = set(inflight.values())
+                for sid in sorted(sources, key=lambda s: self.source_state(s)["next_due"]):
+                    if len(inflight) >= self.concurrency:
+                        break
+                    if sid in busy or self.source_state(sid)["next_due"] > now:
+                        continue
+                    inflight[ex.submit(self._poll, sources[sid])] = sid
+                    busy.add(sid)
+
+                next_due = min((self.source_state(s)["next_due"] for s in sources if s not in busy),
+                               default=now + self.min)
+                pause = max(1.0, next_due - time.time())
+                if not inflight:
+                    time.sleep(pause)  # wait() returns at once on an empty set
+                    continue
+                done, _ = wait(inflight, timeout=pause, return_when=FIRST_COMPLETED)
+                self._finish(inflight, done)
+            self._finish(inflight, wait(inflight).done)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="adaptive polling daemon for sources.csv")
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY, help="sources polled at once")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="article fetch workers (shared)")
+    ap.add_argument("--per-host", type=int, default=run_ingest.PER_HOST)
+    ap.add_argument("--cpu-workers", type=int, default=CPU_WORKERS,
+                    help="processes for HTML extraction / language detection (0 = on the fetch threads)")
+    ap.add_argument("--min", type=float, default=MIN_INTERVAL, help="shortest poll interval (s)")
+    ap.add_argument("--max", type=float, default=MAX_INTERVAL, help="longest poll interval (s)")
+    ap.add_argument("--timeout", type=float, default=TIMEOUT, help="max seconds for one source poll")
+    a = ap.parse_args()
+    run_ingest.PER_HOST = a.per_host
+    metrics.setup()
+
+    ing = Ingestor(workers=a.workers, cpu_workers=a.cpu_workers)
+    try:
+        Scheduler(ing, min_interval=a.min, max_interval=a.max, timeout=a.timeout,
+                  concurrency=a.concurrency).run()
+    except KeyboardInterrupt:
+        print("stopping")
+    finally:
+        ing.close()
+        print(ing.summary())
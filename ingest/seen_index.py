@@ -0,0 +1,69 @@
+# persistent URL/GUID index so known articles are skipped before any download
+
+import json, os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from dateutil import parser as dtp
+from utils import iso_now
+
+
+class SeenIndex:
+    """Maps article URL / feed GUID → first time we saw it (ISO string).
+
+    Seeded from catalog.jsonl the first time it is opened, then kept up to
+    date by ingest and persisted as a small JSON file next to the catalog.
+    """
+
+    def __init__(self, path: Path, catalog: Path | None = None):
+        self.path = Path(path)
+        self.keys = {}
+        if self.path.exists():
+            self.keys = json.loads(self.path.read_text(encoding="utf-8"))
+        elif catalog and Path(catalog).exists():
+            self._seed_from_catalog(Path(catalog))
+            self.save()
+        self._dirty = False
+
+    def _seed_from_catalog(self, catalog: Path):
+        with open(catalog, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row.get("url"):
+                    self.keys.setdefault(row["url"], row.get("published_at") or iso_now())
+
+    def seen(self, entry, refetch_hours: float = 0) -> bool:
+        """True if the entry's link or GUID is known and outside the re-fetch window."""
+        for k in (entry.get("link"), entry.get("guid")):
+            if not k or k not in self.keys:
+                continue
+            if refetch_hours <= 0:
+                return True
+            try:
+                first = dtp.parse(self.keys[k])
+                if first.tzinfo is None:
+                    first = first.replace(tzinfo=timezone.utc)
+            except Exception:
+                return True
+            # recent articles may still be edited → let them through again
+            return datetime.now(timezone.utc) - first > timedelta(hours=refetch_hours)
+        return False
+
+    def add(self, entry):
+        now = iso_now()
+        for k in (entry.get("link"), entry.get("guid")):
+            if k and k not in self.keys:
+                self.keys[k] = now
+                self._dirty = True
+
+    def save(self):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.keys, ensure_ascii=False))
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def flush(self):
+        if self._dirty:
+            self.save()
@@ -1,75 +1,34 @@
-import json, glob
+import sys
 from pathlib import Path
-import pandas as pd
 import streamlit as st
 
-DATA_DIR = Path("data")
-NORM_DIR = DATA_DIR / "normalized"
-CLS_DIR  = DATA_DIR / "classified"
-EXT_DIR  = DATA_DIR / "extracted"
-LABELS_F = DATA_DIR / "labels" / "review.csv"
-LABELS_F.parent.mkdir(parents=True, exist_ok=True)
+sys.path.append(str(Path(__file__).resolve().parent))
+from review_index import ReviewIndex
+from label_store import LabelStore
 
 INCIDENT_TYPES = ["grounding","collision","fire","piracy","weather","port_closure","strike","spill"]
+REFRESH_SECONDS = 30  # how often a rerun re-checks the store for changed docs
+PAGE_SIZE = 25
 
-@st.cache_data
-def load_rows():
-    rows = []
-    cls_files = glob.glob(str(CLS_DIR / "*.classify.json"))
-    for cf in cls_files:
-        with open(cf, "r", encoding="utf-8") as f:
-            cls = json.load(f)
-        doc_id = cls["doc_id"]
-
-        nf = NORM_DIR / (Path(cf).name.replace(".classify.json", ".json"))
-        if not nf.exists():
-            continue
-        with open(nf, "r", encoding="utf-8") as f:
-            norm = json.load(f)
-
-        ef = EXT_DIR / (Path(cf).name.replace(".classify.json", ".extract.json"))
-        extracted = {}
-        if ef.exists():
-            with open(ef, "r", encoding="utf-8") as f:
-                extracted = json.load(f)
-
-        rows.append({
-            "doc_id": doc_id,
-            "title": norm.get("title",""),
-            "url": norm.get("url",""),
-            "published_at": (norm.get("published_at","") or "")[:10],
-            "source_id": norm.get("source_id",""),
-            "is_incident_pred": bool(cls.get("is_incident", False)),
-            "incident_types_pred": ",".join(cls.get("incident_types", [])),
-            "vessel_pred": (extracted.get("vessel") if extracted else None),
-            "imo_pred": (extracted.get("imo") if extracted else None),
-            "port_pred": (extracted.get("port") if extracted else None),
-            "date_pred": (extracted.get("date") if extracted else None),
-            "content_text": (norm.get("content_text","") or "")[:2000],
-        })
-    return pd.DataFrame(rows)
-
-def load_labels():
-    if LABELS_F.exists():
-        return pd.read_csv(LABELS_F)
-    return pd.DataFrame(columns=[
-        "doc_id","is_incident_true","incident_types_true","vessel_true","imo_true","port_true","date_true","notes"
-    ])
-
-def upsert_label(row):
-    df = load_labels()
-    idx = df.index[df["doc_id"] == row["doc_id"]]
-    if len(idx):
-        df.loc[idx[0]] = row
-    else:
-        df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
-    df.to_csv(LABELS_F, index=False)
+@st.cache_resource
+def get_index():
+    return ReviewIndex()
+
+@st.cache_resource
+def get_labels():
+    return LabelStore()
+
+@st.cache_data(ttl=REFRESH_SECONDS)
+def refresh_index():
+    # only docs whose classified/normalized/extracted stamps changed are re-read
+    return get_index().refresh()
 
 st.set_page_config(page_title="Incident Review", layout="wide")
 st.title("Incident Review & Labeling")
 
-data = load_rows()
-labels = load_labels()
+index = get_index()
+refresh_index()
+labels = get_labels()
 
 left, right = st.columns([2,3])
 
@@ -77,19 +36,23 @@ with left:
     st.subheader("Filters")
     only_inc = st.checkbox("Only show predicted incidents", value=True)
     q = st.text_input("Search title")
-    df = data.copy()
-    if only_inc:
-        df = df[df["is_incident_pred"] == True]
-    if q:
-        df = df[df["title"].str.contains(q, case=False, na=False)]
-    st.caption(f"{len(df)} items")
-    idx = st.number_input("Row", min_value=0, max_value=max(len(df)-1,0), value=0, step=1)
+    n = index.count(only_inc, q)
+    st.caption(f"{n} items")
+    idx = int(st.number_input("Row", min_value=0, max_value=max(n-1,0), value=0, step=1))
+    # only the page around the selected row is fetched
+    page_start = idx - idx % PAGE_SIZE
+    df = index.page(only_inc, q, offset=page_start, limit=PAGE_SIZE)
+    st.dataframe(df[["title","published_at","source_id"]].set_index(df.index + page_start),
+                 use_container_width=True, height=300)
+    if st.button("Refresh data"):
+        refresh_index.clear()
+        st.rerun()
 
 with right:
     if len(df) == 0:
         st.info("No rows match your filter.")
     else:
-        row = df.iloc[int(idx)].to_dict()
+        row = df.iloc[min(idx - page_start, len(df) - 1)].to_dict()
         st.subheader(row["title"])
         st.write(f"**Date**: {row['published_at']}  |  **Source**: {row['source_id']}")
         if row["url"]:
@@ -108,8 +71,7 @@ with right:
         st.subheader("Your Labels (Ground Truth)")
 
         # pull prior saved label if exists
-        prior = labels[labels["doc_id"] == row["doc_id"]]
-        prior = prior.iloc[0].to_dict() if len(prior) else {}
+        prior = labels.get(row["doc_id"]) or {}
 
         c1, c2 = st.columns(2)
         is_incident_true = c1.selectbox("Is incident?", [True, False],
@@ -125,7 +87,7 @@ with right:
         notes       = st.text_area("Notes", value=prior.get("notes",""), key=f"n_{row['doc_id']}")
 
         if st.button("💾 Save label", type="primary"):
-            upsert_label({
+            labels.upsert({
                 "doc_id": row["doc_id"],
                 "is_incident_true": bool(is_incident_true),
                 "incident_types_true": ",".join(incident_types_true),
@@ -1,14 +1,15 @@
 # labeling/auto_label_from_predictions.py
-import json, glob, pandas as pd
+import sys
 from pathlib import Path
 
-CLS_DIR = Path("data/classified")
-LABELS = Path("data/labels/review.csv")
-LABELS.parent.mkdir(parents=True, exist_ok=True)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "labeling"))
+from common.docstore import open_store
+from label_store import LabelStore
 
 rows = []
-for f in glob.glob(str(CLS_DIR / "*.classify.json")):
-    j = json.load(open(f))
+for j in open_store(root=ROOT / "data").iter("classified"):
     rows.append({
         "doc_id": j["doc_id"],
         "is_incident_true": bool(j.get("is_incident", False)),
@@ -20,10 +21,7 @@ for f in glob.glob(str(CLS_DIR / "*.classify.json")):
         "notes": "seed-from-pred"
     })
 
-df = pd.DataFrame(rows)
-if LABELS.exists():
-    cur = pd.read_csv(LABELS)
-    df = pd.concat([cur[~cur.doc_id.isin(df.doc_id)], df], ignore_index=True)
-df.to_csv(LABELS, index=False)
-print(f"seeded {len(df)} labeled rows → {LABELS}")
+labels = LabelStore()
+labels.upsert_many(rows)  # replaces existing labels for these doc_ids
+print(f"seeded {len(rows)} labeled rows → {labels.path} ({labels.count()} total)")
 
@@ -1,29 +1,27 @@
 # labeling/auto_label_rules.py
-import json, glob, re, pandas as pd
+import re, sys
 from pathlib import Path
 
-CLS_DIR = Path("data/classified")
-NORM_DIR = Path("data/normalized")
-LABELS = Path("data/labels/review.csv")
-LABELS.parent.mkdir(parents=True, exist_ok=True)
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "labeling"))
+from common.docstore import open_store
+from label_store import LabelStore
 
 INCIDENT_RE = re.compile(r"\b(ground(?:ed|ing)|collision|collided|allision|fire|blaze|on fire|piracy|pirate|hijack(?:ed|ing)|storm|hurricane|typhoon|cyclone|gale|rough seas|port\s+closure|strike|walkout|industrial action|spill|leak)\b", re.I)
 NON_INCIDENT_RE = re.compile(r"\b(sanction|share[s]?\s+hit|tariff|fee|forecast|earning|market|profit|deal|acquisition)\b", re.I)
 
-def norm_for(cf_path: Path) -> Path:
-    return NORM_DIR / cf_path.name.replace(".classify.json", ".json")
+store = open_store(root=ROOT / "data")
+cls_ids = store.ids("classified")
+norms = store.get_many("normalized", cls_ids)
 
 rows = []
-for cf in glob.glob(str(CLS_DIR / "*.classify.json")):
-    cf = Path(cf)
-    cls = json.load(open(cf))
+for doc_id, cls in store.get_many("classified", cls_ids).items():
     title = cls.get("title", "") or ""
-    # pull full text from normalized file
-    nf = norm_for(cf)
+    # pull full text from the normalized doc
     content = ""
-    if nf.exists():
-        norm = json.load(open(nf))
-        content = (norm.get("content_text", "") or "")[:2000]
+    if doc_id in norms:
+        content = (norms[doc_id].get("content_text", "") or "")[:2000]
     text_all = f"{title}\n{content}"
 
     if INCIDENT_RE.search(text_all) and not NON_INCIDENT_RE.search(text_all):
@@ -61,13 +59,9 @@ for cf in glob.glob(str(CLS_DIR / "*.classify.json")):
     })
 
 if rows:
-    df = pd.DataFrame(rows)
-    # If review.csv already exists, append without dupes on doc_id
-    if LABELS.exists():
-        cur = pd.read_csv(LABELS)
-        df = pd.concat([cur[~cur.doc_id.isin(df.doc_id)], df], ignore_index=True)
-    df.to_csv(LABELS, index=False)
-    print(f" wrote {len(df)} labels → {LABELS}")
+    labels = LabelStore()
+    labels.upsert_many(rows)  # replaces existing labels for these doc_ids
+    print(f" wrote {len(rows)} labels → {labels.path} ({labels.count()} total)")
 else:
     print("no matches found – check regex or that normalized files exist.")
 
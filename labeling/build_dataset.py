@@ -1,30 +1,35 @@
-import json
+import sys
 import pandas as pd
 from pathlib import Path
 
-# input folders
-NORM_DIR = Path("data/normalized")
-LABELS = Path("data/labels/review.csv")
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "labeling"))
+from common.docstore import open_store
+from label_store import LabelStore, CSV_PATH
 
 # output folder
 OUT = Path("datasets")
 OUT.mkdir(parents=True, exist_ok=True)
 
 def main():
-    if not LABELS.exists():
-        print(" No labels found at data/labels/review.csv. Run the Streamlit app and save a few labels first.")
+    labels = LabelStore()
+    if not labels.count():
+        print(" No labels found in data/labels/labels.sqlite. Run the Streamlit app and save a few labels first.")
         return
 
-    gold = pd.read_csv(LABELS)
+    # keep the CSV snapshot alongside the datasets it produced
+    labels.export_csv(CSV_PATH)
+    gold = pd.read_csv(CSV_PATH, keep_default_na=False)
+    norms = open_store(root=ROOT / "data").get_many("normalized", gold.doc_id.tolist())
     rows = []
 
     for _, r in gold.iterrows():
-        # match doc_id from normalized folder
-        norm_file = NORM_DIR / f"{r.doc_id}.json"
-        if not norm_file.exists():
+        # match doc_id from the normalized docs
+        doc = norms.get(r.doc_id)
+        if doc is None:
             continue
 
-        doc = json.load(open(norm_file))
         text = (doc.get("title", "") or "") + "\n" + (doc.get("content_text", "") or "")[:1200]
 
         rows.append({
@@ -0,0 +1,112 @@
+# ground-truth labels keyed by doc_id (data/labels/labels.sqlite)
+#
+# One row per doc, replaced atomically on save, so the review app and the
+# auto-label scripts can write at the same time without losing each other's
+# updates. The first open imports data/labels/review.csv if it exists; the CSV
+# stays available as an export for build_dataset.py and spreadsheets.
+#
+#   python labeling/label_store.py export [out.csv]
+#   python labeling/label_store.py import in.csv
+
+import csv, io, sqlite3, sys, threading, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.atomic import write_text_atomic
+
+LABELS_DIR = Path(__file__).resolve().parents[1] / "data" / "labels"
+DB_PATH = LABELS_DIR / "labels.sqlite"
+CSV_PATH = LABELS_DIR / "review.csv"
+
+FIELDS = ["doc_id","is_incident_true","incident_types_true","vessel_true","imo_true","port_true","date_true","notes"]
+
+
+def _bool(x):
+    if isinstance(x, str):
+        return x.strip().lower() in ("true", "1", "yes")
+    return bool(x)
+
+
+def _clean(v):
+    # pandas hands over NaN for empty CSV cells
+    return "" if v is None or v != v else str(v)
+
+
+class LabelStore:
+    def __init__(self, path: Path = DB_PATH, seed_csv: Path | None = CSV_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            self.db.execute("""CREATE TABLE IF NOT EXISTS labels (
+                doc_id TEXT PRIMARY KEY, is_incident_true INTEGER, incident_types_true TEXT,
+                vessel_true TEXT, imo_true TEXT, port_true TEXT, date_true TEXT, notes TEXT,
+                updated_at REAL)""")
+        if seed_csv and Path(seed_csv).exists() and not self.count():
+            self.import_csv(seed_csv)
+
+    def _row(self, r: dict) -> tuple:
+        return (str(r["doc_id"]), int(_bool(r.get("is_incident_true"))),
+                *(_clean(r.get(k)) for k in FIELDS[2:]), time.time())
+
+    def upsert(self, row: dict):
+        self.upsert_many([row])
+
+    def upsert_many(self, rows):
+        """Insert or replace by doc_id, all in one transaction."""
+        rows = [self._row(r) for r in rows]
+        with self._lock, self.db:
+            self.db.executemany(f"""INSERT INTO labels VALUES ({','.join('?' * 9)})
+                ON CONFLICT(doc_id) DO UPDATE SET
+                {', '.join(f'{k} = excluded.{k}' for k in FIELDS[1:])}, updated_at = excluded.updated_at""", rows)
+        return len(rows)
+
+    def _dict(self, r) -> dict:
+        d = dict(zip(FIELDS, r))
+        d["is_incident_true"] = bool(d["is_incident_true"])
+        return d
+
+    def get(self, doc_id: str) -> dict | None:
+        with self._lock:
+            r = self.db.execute(f"SELECT {','.join(FIELDS)} FROM labels WHERE doc_id = ?", (doc_id,)).fetchone()
+        return self._dict(r) if r else None
+
+    def all(self) -> list[dict]:
+        with self._lock:
+            rows = self.db.execute(f"SELECT {','.join(FIELDS)} FROM labels ORDER BY doc_id").fetchall()
+        return [self._dict(r) for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+
+    def export_csv(self, out: Path = CSV_PATH) -> int:
+        rows = self.all()
+        buf = io.StringIO()
+        w = csv.DictWriter(buf, fieldnames=FIELDS, lineterminator="\n")
+        w.writeheader()
+        w.writerows(rows)
+        Path(out).parent.mkdir(parents=True, exist_ok=True)
+        write_text_atomic(out, buf.getvalue())
+        return len(rows)
+
+    def import_csv(self, path: Path) -> int:
+        with open(path, newline="", encoding="utf-8") as f:
+            return self.upsert_many(r for r in csv.DictReader(f) if r.get("doc_id"))
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "export"
+    store = LabelStore()
+    if cmd == "export":
+        out = Path(sys.argv[2]) if len(sys.argv) > 2 else CSV_PATH
+        print(f"exported {store.export_csv(out)} labels → {out}")
+    elif cmd == "import" and len(sys.argv) > 2:
+        print(f"imported {store.import_csv(Path(sys.argv[2]))} labels from {sys.argv[2]}")
+    else:
+        sys.exit("usage: label_store.py export [out.csv] | import in.csv")
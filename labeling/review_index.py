@@ -0,0 +1,111 @@
+# joined classified + normalized + extracted view for the review app
+#
+# A small SQLite table (data/review.sqlite) with one row per classified doc,
+# refreshed incrementally: each doc remembers the store stamps of its three
+# inputs, and refresh() only re-reads docs whose stamps changed. The app then
+# filters, counts and pages with SQL instead of holding every doc in a frame.
+#
+#   python labeling/review_index.py            # refresh + print counts
+
+import json, sqlite3, sys, threading
+from pathlib import Path
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.docstore import open_store
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+INDEX_PATH = DATA_DIR / "review.sqlite"
+
+COLUMNS = ["doc_id", "title", "url", "published_at", "source_id", "is_incident_pred",
+           "incident_types_pred", "vessel_pred", "imo_pred", "port_pred", "date_pred", "content_text"]
+
+
+def _row(cls, norm, ext):
+    return {
+        "doc_id": cls["doc_id"],
+        "title": norm.get("title",""),
+        "url": norm.get("url",""),
+        "published_at": (norm.get("published_at","") or "")[:10],
+        "source_id": norm.get("source_id",""),
+        "is_incident_pred": bool(cls.get("is_incident", False)),
+        "incident_types_pred": ",".join(cls.get("incident_types", [])),
+        "vessel_pred": ext.get("vessel"),
+        "imo_pred": ext.get("imo"),
+        "port_pred": ext.get("port"),
+        "date_pred": ext.get("date"),
+        "content_text": (norm.get("content_text","") or "")[:2000],
+    }
+
+
+class ReviewIndex:
+    def __init__(self, path: Path = INDEX_PATH, store=None):
+        self.store = store or open_store(root=DATA_DIR)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()  # streamlit reruns on several threads
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"""CREATE TABLE IF NOT EXISTS rows (
+            doc_id TEXT PRIMARY KEY, title TEXT, url TEXT, published_at TEXT, source_id TEXT,
+            is_incident_pred INTEGER, incident_types_pred TEXT, vessel_pred TEXT, imo_pred TEXT,
+            port_pred TEXT, date_pred TEXT, content_text TEXT, stamp TEXT)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS rows_inc ON rows(is_incident_pred, published_at)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS rows_pub ON rows(published_at)")
+        self.db.commit()
+
+    def refresh(self, batch: int = 500) -> dict:
+        """Re-read only docs whose inputs changed; drop docs that disappeared."""
+        cls_st = self.store.stamps("classified")
+        norm_st = self.store.stamps("normalized")
+        ext_st = self.store.stamps("extracted")
+        want = {d: json.dumps([s, norm_st[d], ext_st.get(d)]) for d, s in cls_st.items() if d in norm_st}
+        with self._lock:
+            have = dict(self.db.execute("SELECT doc_id, stamp FROM rows"))
+        changed = [d for d, s in want.items() if have.get(d) != s]
+        gone = [d for d in have if d not in want]
+
+        for i in range(0, len(changed), batch):
+            ids = changed[i:i + batch]
+            cls = self.store.get_many("classified", ids)
+            norms = self.store.get_many("normalized", ids)
+            exts = self.store.get_many("extracted", ids)
+            rows = [(*_row(cls[d], norms[d], exts.get(d, {})).values(), want[d])
+                    for d in ids if d in cls and d in norms]
+            with self._lock, self.db:
+                self.db.executemany(f"INSERT OR REPLACE INTO rows VALUES ({','.join('?' * 13)})", rows)
+        if gone:
+            with self._lock, self.db:
+                self.db.executemany("DELETE FROM rows WHERE doc_id = ?", [(d,) for d in gone])
+        return {"total": len(want), "updated": len(changed), "removed": len(gone)}
+
+    @staticmethod
+    def _where(only_incidents: bool, query: str):
+        clauses, args = [], []
+        if only_incidents:
+            clauses.append("is_incident_pred = 1")
+        if query:
+            clauses.append("title LIKE ? ESCAPE '\\'")
+            args.append("%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def count(self, only_incidents=False, query="") -> int:
+        where, args = self._where(only_incidents, query)
+        with self._lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM rows{where}", args).fetchone()[0]
+
+    def page(self, only_incidents=False, query="", offset=0, limit=50) -> pd.DataFrame:
+        """Rows [offset, offset+limit) of the filtered view, newest first."""
+        where, args = self._where(only_incidents, query)
+        with self._lock:
+            cur = self.db.execute(f"SELECT {','.join(COLUMNS)} FROM rows{where} "
+                                  "ORDER BY published_at DESC, doc_id LIMIT ? OFFSET ?",
+                                  [*args, limit, offset])
+            df = pd.DataFrame(cur.fetchall(), columns=COLUMNS)
+        df["is_incident_pred"] = df["is_incident_pred"].astype(bool)
+        return df
+
+
+if __name__ == "__main__":
+    idx = ReviewIndex()
+    print(idx.refresh(), f"incidents: {idx.count(only_incidents=True)}")
@@ -0,0 +1,265 @@
+# streaming pipeline: ingest → classify → extract in one process
+#
+#   python -m pipeline.run                   # one ingest pass, drain, exit
+#   python -m pipeline.run --loop 300        # poll every 5 min, forever
+#   python -m pipeline.run --schedule        # adaptive per-source polling, forever
+#
+# Stages are worker threads joined by bounded queues. A doc is classified as
+# soon as ingest has written it and extracted as soon as it is classified;
+# non-incidents drop out after classification. A full queue blocks the stage
+# feeding it (backpressure), so a slow LLM slows fetching rather than piling
+# up memory. Outputs and manifests are the same as the batch scripts write,
+# so classify/run.py and extract/run.py skip whatever the pipeline handled.
+
+import argparse, os, queue, statistics, sys, threading, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "ingest"))  # ingest uses flat imports (utils, seen_index, ...)
+from common import metrics, profiling
+from common.docstore import open_store
+from common.manifest import Manifest
+from classify.run import get_provider, classify_docs, doc_hash as classify_hash, make_output as classify_output, \
+    BATCH_SIZE as CLASSIFY_BATCH
+from classify.providers.base import ERROR_RESULT
+from extract.run import extract_many, manifest_version, doc_hash as extract_hash, make_output as extract_output, \
+    BATCH_SIZE as EXTRACT_BATCH
+import run_ingest
+
+QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE", "256"))
+# one classify batch at a time: a batch already keeps AZURE_OPENAI_CONCURRENCY
+# requests in flight, and each extra worker (sharing the provider and its rate
+# limiter) adds that many again
+CLASSIFY_WORKERS = int(os.environ.get("PIPELINE_CLASSIFY_WORKERS", "1"))
+EXTRACT_WORKERS = int(os.environ.get("PIPELINE_EXTRACT_WORKERS", "1"))  # spaCy is CPU/GIL bound
+REPORT_EVERY = float(os.environ.get("PIPELINE_REPORT", "10"))
+
+MANIFESTS = ROOT / "data" / "manifests"
+
+DONE = object()  # end-of-stream marker
+
+QUEUE_DEPTH = metrics.gauge("pipeline_queue_depth", "Docs waiting in front of a stage")
+STAGE_SECONDS = metrics.histogram("pipeline_batch_seconds", "One batch through a stage")
+
+
+class Stage:
+    """Worker threads that take batches from inq, run fn, and put results on outq.
+
+    A batch is whatever is queued right now (up to `batch`), so a lone doc is
+    never held back waiting for company.
+    """
+
+    def __init__(self, name, fn, inq, outq=None, workers=1, batch=1):
+        self.name, self.fn, self.inq, self.outq = name, fn, inq, outq
+        self.batch = batch
+        self.n_in = self.n_out = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+        return self
+
+    def _take(self):
+        first = self.inq.get()
+        if first is DONE:
+            self.inq.put(DONE)  # let sibling workers see it too
+            return None
+        items = [first]
+        while len(items) < self.batch:
+            try:
+                x = self.inq.get_nowait()
+            except queue.Empty:
+                break
+            if x is DONE:
+                self.inq.put(DONE)
+                break
+            items.append(x)
+        return items
+
+    def _work(self):
+        while (items := self._take()) is not None:
+            t0 = time.perf_counter()
+            try:
+                outs = self.fn(items)
+            except Exception as e:  # keep the stream alive; the batch scripts retry later
+                print(f"[{self.name}] batch of {len(items)} failed: {e}")
+                outs = []
+            STAGE_SECONDS.observe(time.perf_counter() - t0, stage=self.name)
+            QUEUE_DEPTH.set(self.inq.qsize(), stage=self.name)
+            with self._lock:
+                self.n_in += len(items)
+                self.n_out += len(outs)
+                self.busy += time.perf_counter() - t0
+            if self.outq is not None:
+                for o in outs:
+                    self.outq.put(o)  # blocks when downstream is full
+
+    def join(self):
+        for t in self._threads:
+            t.join()
+        if self.outq is not None:
+            self.outq.put(DONE)
+
+
+class Pipeline:
+    def __init__(self, classify_workers=CLASSIFY_WORKERS, extract_workers=EXTRACT_WORKERS,
+                 queue_size=QUEUE_SIZE, store=None, manifests: Path = MANIFESTS):
+        self.store = store or open_store()
+        self.clf = get_provider()
+        self.mlock = threading.Lock()  # manifests are plain dicts shared by the workers
+        self.cls_manifest = Manifest(manifests / "classify.json", self.clf.version)
+        self.ext_manifest = Manifest(manifests / "extract.json", manifest_version())
+        self.latency = {"incident": [], "other": []}
+        self.to_classify = queue.Queue(maxsize=queue_size)
+        self.to_extract = queue.Queue(maxsize=queue_size)
+        self.classify = Stage("classify", self._classify, self.to_classify, self.to_extract,
+                              classify_workers, CLASSIFY_BATCH)
+        self.extract = Stage("extract", self._extract, self.to_extract, None,
+                             extract_workers, EXTRACT_BATCH)
+        self.ingested = 0
+        self.t_start = time.monotonic()
+
+    # ---- stages ----
+
+    def feed(self, doc):
+        """ingest_once(on_doc=...) callback; blocks while classification is backed up."""
+        self.ingested += 1
+        self.to_classify.put((time.monotonic(), doc))
+
+    def _classify(self, items):
+        todo = []
+        for t0, doc in items:
+            # near-duplicate of another doc → that one is the story's representative
+            if doc.get("canonical_id", doc["doc_id"]) != doc["doc_id"]:
+                self._record(self.cls_manifest, doc["doc_id"], classify_hash(doc),
+                             self.store.stamp("normalized", doc["doc_id"]))
+            else:
+                todo.append((t0, doc))
+        if not todo:
+            return []
+        results = classify_docs(self.clf, [d for _, d in todo])
+        outs = [classify_output(d, r) for (_, d), r in zip(todo, results)]
+        self.store.put_many("classified", outs)
+
+        forward = []
+        for (t0, doc), cls, res in zip(todo, outs, results):
+            key = doc["doc_id"]
+            ns = self.store.stamp("normalized", key)
+            if res != ERROR_RESULT:
+                self._record(self.cls_manifest, key, classify_hash(doc), ns)
+            if cls.get("is_incident"):
+                forward.append((t0, doc, cls))
+            else:
+                self._record(self.ext_manifest, key, extract_hash(cls),
+                             self.store.stamp("classified", key), ns)
+                self._done("other", t0)
+        return forward
+
+    def _extract(self, items):
+        pending = ((d.get("title", ""), d.get("content_text", ""), d.get("published_at"), (t0, d, cls))
+                   for t0, d, cls in items)
+        outs = []
+        with profiling.naming((d.get("content_text", ""), d["doc_id"]) for _, d, _ in items):
+            for ents, (t0, doc, cls) in extract_many(pending, EXTRACT_BATCH):
+                key = doc["doc_id"]
+                out = extract_output(doc, ents)
+                self.store.put("extracted", out)
+                self._record(self.ext_manifest, key, extract_hash(cls, doc),
+                             self.store.stamp("classified", key), self.store.stamp("normalized", key))
+                self._done("incident", t0)
+                outs.append(out)
+        return outs
+
+    def _record(self, manifest, key, chash, *stamps):
+        with self.mlock:
+            manifest.record(key, chash, *stamps)
+
+    def _done(self, kind, t0):
+        with self.mlock:
+            self.latency[kind].append(time.monotonic() - t0)
+
+    # ---- reporting ----
+
+    def save(self):
+        with self.mlock:
+            self.cls_manifest.save()
+            self.ext_manifest.save()
+
+    def report(self, final=False):
+        elapsed = max(time.monotonic() - self.t_start, 1e-9)
+        parts = [f"ingest {self.ingested}"]
+        for st, q in ((self.classify, self.to_classify), (self.extract, self.to_extract)):
+            parts.append(f"{st.name} {st.n_in}→{st.n_out} {st.n_in / elapsed:.1f}/s "
+                         f"busy {st.busy / elapsed:.0%} q {q.qsize()}")
+        print(("[done] " if final else "[pipeline] ") + " | ".join(parts))
+        if final:
+            for kind, lat in self.latency.items():
+                if lat:
+                    lat = sorted(lat)
+                    print(f"  latency ({kind}): n {len(lat)}  p50 {statistics.median(lat):.2f}s  "
+                          f"p95 {lat[int(0.95 * (len(lat) - 1))]:.2f}s  max {lat[-1]:.2f}s")
+
+    def _reporter(self, stop: threading.Event):
+        while not stop.wait(REPORT_EVERY):
+            self.report()
+            self.save()
+
+    # ---- driver ----
+
+    def run(self, loop: float = 0, schedule: bool = False, **ingest_kw):
+        ingest_kw.setdefault("store", self.store)  # ingest writes where the stages read
+        self.classify.start()
+        self.extract.start()
+        stop = threading.Event()
+        threading.Thread(target=self._reporter, args=(stop,), daemon=True).start()
+        try:
+            if schedule:  # adaptive per-source polling, forever
+                from scheduler import Scheduler
+                ing = run_ingest.Ingestor(on_doc=self.feed, **ingest_kw)
+                try:
+                    Scheduler(ing).run()
+                finally:
+                    ing.close()
+            while not schedule:
+                run_ingest.ingest_once(on_doc=self.feed, **ingest_kw)
+                if not loop:
+                    break
+                time.sleep(loop)
+        except KeyboardInterrupt:
+            print("interrupted: draining queues")
+        finally:
+            self.to_classify.put(DONE)
+            self.classify.join()
+            self.extract.join()
+            stop.set()
+            self.save()
+            self.report(final=True)
+            if getattr(self.clf, "cache", None) is not None:
+                print(self.clf.cache.report())
+            self.store.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="ingest → classify → extract, streaming")
+    ap.add_argument("--loop", type=float, default=0, help="re-poll sources every N seconds (0 = one pass)")
+    ap.add_argument("--schedule", action="store_true",
+                    help="poll each source on its adaptive interval (ingest/scheduler.py) instead")
+    ap.add_argument("--classify-workers", type=int, default=CLASSIFY_WORKERS,
+                    help="classify batches in flight (each runs the provider's own concurrency)")
+    ap.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS)
+    ap.add_argument("--queue", type=int, default=QUEUE_SIZE, help="max docs waiting between two stages")
+    ap.add_argument("--ingest-workers", type=int, default=run_ingest.WORKERS)
+    ap.add_argument("--ingest-cpu-workers", type=int, default=run_ingest.CPU_WORKERS,
+                    help="processes for HTML extraction / language detection (0 = on the fetch threads)")
+    profiling.add_argument(ap)
+    a = ap.parse_args()
+    metrics.setup()
+    profiling.setup("pipeline", a.profile)
+    Pipeline(a.classify_workers, a.extract_workers, a.queue).run(loop=a.loop, schedule=a.schedule,
+                                                                 workers=a.ingest_workers,
+                                                                 cpu_workers=a.ingest_cpu_workers)
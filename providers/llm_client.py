@@ -1,6 +1,16 @@
 import os
-import requests
 import json
+from common import http_client as http
+from common.llm_cache import open_cache, make_key
+from classify.providers.throttle import llm_call
+
+_cache = None
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = open_cache("call_llm")
+    return _cache
 
 def call_llm(messages):
     # Prefer Azure if available
@@ -26,7 +36,20 @@ def call_llm(messages):
         "temperature": 0,
     }
 
-    r = requests.post(url, headers=headers, data=json.dumps(data))
-    r.raise_for_status()
-    return r.json()["choices"][0]["message"]["content"]
+    # same endpoint + model + messages → same answer at temperature 0
+    cache = _get_cache()
+    key = make_key(url.split("?")[0], data["model"], data["temperature"],
+                   json.dumps(messages, ensure_ascii=False)) if cache else None
+    if key and (hit := cache.get(key)) is not None:
+        return hit
+
+    # pooled keep-alive session; retries 429/5xx with backoff + jitter
+    body = json.dumps(data)
+    with llm_call("call_llm"):
+        r = http.post(url, headers=headers, data=body, timeout=60)
+        r.raise_for_status()
+    content = r.json()["choices"][0]["message"]["content"]
+    if key:
+        cache.put(key, content, len(body))
+    return content
 
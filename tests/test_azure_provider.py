@@ -0,0 +1,76 @@
+# AzureOpenAIClassifier against an in-process fake of the async OpenAI client
+
+import asyncio, json, random, threading, time
+from types import SimpleNamespace
+
+import pytest
+
+from classify.providers import azure_provider
+from classify.providers.base import ERROR_RESULT
+from classify.providers.throttle import RATE_LIMIT_RETRIES
+
+
+class RateLimitError(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "0.01"})
+
+
+class FakeAsyncClient:
+    calls = []  # system prompt of every request
+    throttled = False
+
+    def __init__(self, **kw):
+        self.closed = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, messages, **kw):
+        self.calls.append(messages[0]["content"])
+        await asyncio.sleep(random.uniform(0.001, 0.02))
+        if self.closed:
+            raise RuntimeError("client closed")
+        if self.throttled:
+            raise RateLimitError()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(
+            content=json.dumps({"is_incident": True, "incident_types": ["fire"], "confidence": 0.9})))])
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clf(monkeypatch):
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "http://fake")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "k")
+    monkeypatch.setenv("AZURE_OPENAI_DEPLOYMENT", "d")
+    monkeypatch.setattr(azure_provider, "AzureOpenAI", lambda **kw: None)
+    monkeypatch.setattr(azure_provider, "AsyncAzureOpenAI", FakeAsyncClient)
+    monkeypatch.setattr(azure_provider, "open_cache", lambda *a, **kw: None)
+    monkeypatch.setattr(FakeAsyncClient, "calls", [])
+    return azure_provider.AzureOpenAIClassifier()
+
+
+def test_classify_batch_from_two_threads(clf):
+    results = {}
+
+    def run(n):
+        time.sleep(0.01 * n)  # staggered: one batch finishes while the other is in flight
+        results[n] = clf.classify_batch([f"ship fire {n} {i}" for i in range(20)])
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    flat = results[0] + results[1]
+    assert len(flat) == 40
+    assert all(r != ERROR_RESULT and r["incident_types"] == ["fire"] for r in flat)
+    assert not clf._async  # every run closed and dropped its client
+
+
+def test_throttled_pack_is_not_fanned_out(clf, monkeypatch):
+    monkeypatch.setattr(azure_provider, "PACK_SIZE", 4)
+    monkeypatch.setattr(FakeAsyncClient, "throttled", True)
+    results = clf.classify_batch([f"ship fire {i}" for i in range(8)])
+    assert results == [ERROR_RESULT] * 8
+    # two packs, each tried 1 + RATE_LIMIT_RETRIES times, and no single-item requests
+    assert FakeAsyncClient.calls == [azure_provider.PACKED_PROMPT] * 2 * (1 + RATE_LIMIT_RETRIES)
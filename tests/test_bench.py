@@ -0,0 +1,26 @@
+# the benchmark must not write outside its scratch dir
+
+import pytest
+
+for mod in ("requests", "feedparser", "bs4", "trafilatura", "langdetect", "dateutil"):
+    pytest.importorskip(mod)  # run_ingest's dependencies
+
+from bench import run as bench
+from bench.corpus import make_corpus
+from bench.server import BenchServer
+
+
+@pytest.mark.parametrize("backend", ["folder", "sqlite"])
+def test_ingest_stage_leaves_repo_data_alone(backend, monkeypatch):
+    monkeypatch.setenv("DOC_STORE", backend)  # read by the stage's fresh interpreter
+    server = BenchServer(make_corpus(20, 1)).start()
+    cfg = {"docs": 20, "seed": 1, "url": server.url, "sources": server.sources(), "llm": "mock",
+           "ingest_workers": 2, "ingest_cpu_workers": 0, "per_host": 4, "polite": False}
+    before = bench._data_snapshot()
+    try:
+        res = bench.run_stage("ingest", cfg)
+    finally:
+        server.stop()
+    assert "skipped" not in res, res
+    assert res["docs"] > 0
+    assert bench._data_snapshot() == before
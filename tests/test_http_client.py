@@ -0,0 +1,54 @@
+# Retry-After handling of the shared session
+
+import threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+pytest.importorskip("requests")
+
+from common import http_client
+
+
+def _serve(retry_after):
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(time.monotonic())
+            self.send_response(429)
+            self.send_header("Retry-After", retry_after)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *a):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, hits
+
+
+def _get(srv):
+    return http_client.get(f"http://127.0.0.1:{srv.server_port}/x", timeout=5)
+
+
+def test_short_retry_after_is_honoured():
+    srv, hits = _serve("1")
+    try:
+        assert _get(srv).status_code == 429
+    finally:
+        srv.shutdown()
+    assert len(hits) == 1 + http_client.RETRIES
+    assert all(b - a >= 0.9 for a, b in zip(hits, hits[1:]))
+
+
+def test_long_retry_after_is_handed_back():
+    srv, hits = _serve("3600")
+    try:
+        t0 = time.monotonic()
+        assert _get(srv).status_code == 429
+        assert time.monotonic() - t0 < 1
+    finally:
+        srv.shutdown()
+    assert len(hits) == 1
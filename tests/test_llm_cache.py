@@ -0,0 +1,24 @@
+# size accounting when several LLMCache instances share one file
+
+from common.llm_cache import LLMCache
+
+
+def test_total_is_shared_across_instances(tmp_path):
+    path = tmp_path / "llm.sqlite"
+    a = LLMCache(path, max_bytes=10_000, namespace="a")
+    b = LLMCache(path, max_bytes=10_000, namespace="b")
+    for i in range(8):
+        a.put(f"a{i}", "x" * 1000)
+        b.put(f"b{i}", "y" * 1000)
+    size = a.db.execute("SELECT SUM(size) FROM cache").fetchone()[0]
+    assert size <= 10_000  # b saw a's rows when deciding to evict
+    assert a.total == b.total == size
+    b.delete("b7")
+    assert a.total == size - 1000
+
+
+def test_version_change_frees_its_bytes(tmp_path):
+    path = tmp_path / "llm.sqlite"
+    LLMCache(path, namespace="clf", version="1").put("k", "x" * 500)
+    LLMCache(path, namespace="other").put("o", "y" * 300)
+    assert LLMCache(path, namespace="clf", version="2").total == 300
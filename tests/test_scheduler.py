@@ -0,0 +1,39 @@
+# adaptive poll intervals (no network: Scheduler.update only)
+
+import pytest
+
+for mod in ("feedparser", "bs4", "trafilatura", "langdetect", "dateutil"):
+    pytest.importorskip(mod)  # run_ingest's dependencies
+
+import scheduler
+
+
+def test_steady_source_converges_to_target_interval(tmp_path, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(scheduler.time, "time", lambda: clock[0])
+    monkeypatch.setattr(scheduler, "TARGET_NEW", 1.0)
+    sch = scheduler.Scheduler(None, state_path=tmp_path / "s.json", min_interval=60, max_interval=6 * 3600)
+    published = 0.0  # a feed posting 6 docs per hour, like clockwork
+    sch.update("s", 0)
+    for _ in range(60):
+        st = sch.source_state("s")
+        clock[0] += st["interval"]
+        before, published = published, published + st["interval"] * 6 / 3600
+        sch.update("s", int(published) - int(before))
+    st = sch.source_state("s")
+    assert st["rate_per_hour"] == pytest.approx(6, rel=0.2)
+    assert st["interval"] == pytest.approx(600, rel=0.2)  # one new doc per poll
+
+
+def test_quiet_poll_after_burst_keeps_history(tmp_path, monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(scheduler.time, "time", lambda: clock[0])
+    sch = scheduler.Scheduler(None, state_path=tmp_path / "s.json", min_interval=60, max_interval=6 * 3600)
+    sch.update("s", 0)
+    for _ in range(10):
+        clock[0] += 600
+        sch.update("s", 1)
+    busy = sch.source_state("s")["interval"]
+    clock[0] += 600
+    sch.update("s", 0)
+    assert sch.source_state("s")["interval"] < 2 * busy